@@ -12,22 +12,28 @@ can explore pollution trends, filter parameters, and analyze exposure risks.
 
 
 import streamlit as st
-from src.pages import home, explorer, risk
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from src.pages import PAGES, load_page
+from src.utils import perf
 
 #Set page configuration
 st.set_page_config(page_title="Lantern Air Lite", layout="wide")
 
-#Set dict of page names to module names
-PAGES = {
-    "Home": home,
-    "Air Quality Explorer": explorer,
-    "Asthma Risk": risk,
-}
-
 #Create sidebar of pages
 st.sidebar.title("Lantern Air Lite")
 selection = st.sidebar.radio("Navigate", list(PAGES.keys()))
 
-#Run the selected page
-page = PAGES[selection]
+#Debug panel with per-stage timings of this rerun
+show_perf = st.sidebar.toggle("Show performance panel", value=False)
+
+#Run the selected page, timing its stages
+ctx = get_script_run_ctx()
+perf.start_run(selection, session=ctx.session_id if ctx else None)
+#Page modules (and their plotting/map libraries) load on first selection
+page = load_page(selection)
+perf.lap("import page")
 page.app()
+records = perf.finish_run()
+
+if show_perf:
+    perf.render_panel(st.sidebar, records)
@@ -0,0 +1,68 @@
+"""
+Render time of the explorer line chart before and after downsampling.
+
+Run from the repo root:
+    python -m benchmarks.bench_downsample --sizes 100000 1000000 10000000
+"""
+import argparse
+import io
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+from src.utils.downsample import DOWNSAMPLERS, downsample, point_budget
+
+
+def synthetic_series(n: int, seed: int = 0):
+    """
+    Hourly PM-like series with a daily cycle, noise and a few spikes.
+    """
+    rng = np.random.default_rng(seed)
+    x = np.datetime64("2020-01-01T00") + np.arange(n).astype("timedelta64[h]")
+    hours = np.arange(n)
+    y = 30 + 10 * np.sin(hours * 2 * np.pi / 24) + rng.normal(0, 5, n)
+    spikes = rng.choice(n, size=max(n // 100_000, 1), replace=False)
+    y[spikes] += 300
+    return x, y
+
+
+def render(x, y) -> float:
+    """
+    Plot and rasterize the series the same way the explorer does; seconds.
+    """
+    start = time.perf_counter()
+    fig, ax = plt.subplots(figsize=(8, 4))
+    ax.plot(x, y, linewidth=2, color="steelblue")
+    fig.savefig(io.BytesIO(), format="png")
+    plt.close(fig)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--skip-raw", action="store_true", help="only time downsampled renders")
+    args = parser.parse_args()
+
+    fig, _ = plt.subplots(figsize=(8, 4))
+    budget = point_budget(fig)
+    plt.close(fig)
+
+    print(f"{'points':>12} {'method':>8} {'reduce s':>9} {'render s':>9} {'kept':>7} peak")
+    for n in args.sizes:
+        x, y = synthetic_series(n)
+        if not args.skip_raw:
+            print(f"{n:>12} {'raw':>8} {0:>9.3f} {render(x, y):>9.3f} {n:>7} yes")
+        for method in DOWNSAMPLERS:
+            start = time.perf_counter()
+            xs, ys = downsample(x, y, budget, method)
+            reduce_s = time.perf_counter() - start
+            peak = "yes" if ys.max() == y.max() else "NO"
+            print(f"{n:>12} {method:>8} {reduce_s:>9.3f} {render(xs, ys):>9.3f} {len(xs):>7} {peak}")
+
+
+if __name__ == "__main__":
+    main()
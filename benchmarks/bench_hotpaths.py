@@ -0,0 +1,172 @@
+"""
+Time the ingest and analytics hot paths on synthetic OpenAQ data.
+
+Run from the repo root:
+    python -m benchmarks.bench_hotpaths --sizes 10000 100000 1000000 --output bench.json
+    python -m benchmarks.bench_hotpaths --output new.json --compare bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import folium
+import pandas as pd
+
+from benchmarks.synthetic import write_synthetic_csv
+from src.pages.explorer import (
+    aggregate_sensors, compute_summary, filter_data, sensors_geojson, try_build_pivot,
+)
+from src.utils.build_master import build_master
+from src.utils.clean_data import load_openaq
+from src.utils.ingest import ingest_cities
+from src.utils.risk_scale import compute_risk_batch
+from src.utils.sorted_index import SortedIndex
+
+
+def timed(fn, repeat: int) -> float:
+    """
+    Best wall time of fn() over repeat runs, in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def build_map(sub: pd.DataFrame) -> str:
+    # Same construction as the explorer map, rendered to its HTML payload
+    sensors = aggregate_sensors(sub)
+    fmap = folium.Map(location=[sensors["latitude"].mean(), sensors["longitude"].mean()])
+    folium.GeoJson(
+        sensors_geojson(sensors, "µg/m³"),
+        marker=folium.CircleMarker(radius=5, color="crimson", fill=True),
+    ).add_to(fmap)
+    return fmap.get_root().render()
+
+
+def run_build_master(registry: dict, out_dir: str):
+    # The real build (master CSV, rollups, shared publish) into a temp dir,
+    # without its progress lines
+    os.makedirs(out_dir, exist_ok=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        build_master(
+            registry,
+            master_path=os.path.join(out_dir, "air_quality_master.csv"),
+            rollup_dir=os.path.join(out_dir, "rollups"),
+            shared_dir=os.path.join(out_dir, "shared"),
+            use_cache=False,
+        )
+
+
+def run_size(n_rows: int, n_sensors: int, workdir: str, repeat: int) -> list:
+    """
+    All benchmark cases for one dataset size (rows split across both cities).
+    """
+    half = n_rows // 2
+    registry = {
+        "Kampala": {
+            "sources": [write_synthetic_csv(
+                os.path.join(workdir, f"kampala_{n_rows}.csv"), "kampala", half, n_sensors)],
+            "timezone": "Africa/Kampala",
+        },
+        "Boston": {
+            "sources": [write_synthetic_csv(
+                os.path.join(workdir, f"boston_{n_rows}.csv"), "boston", n_rows - half, n_sensors)],
+            "timezone": "America/New_York",
+        },
+    }
+    kampala_csv = registry["Kampala"]["sources"][0]
+
+    # The app's Parquet cache is bypassed throughout: cases time the parse,
+    # and no cache entries are left behind for the temporary CSVs
+    df = ingest_cities(registry, workers=1, use_cache=False)
+    index = SortedIndex(df)
+    sub = filter_data(index, "Kampala", "pm25")
+
+    cases = {
+        "load_openaq": lambda: load_openaq(kampala_csv, use_cache=False),
+        "load_openaq_stream": lambda: load_openaq(kampala_csv, use_cache=False, chunksize=1_000_000),
+        "build_master": lambda: run_build_master(registry, os.path.join(workdir, f"build_{n_rows}")),
+        "filter_data": lambda: filter_data(df, "Kampala", "pm25", 40.0),
+        "filter_data_indexed": lambda: filter_data(index, "Kampala", "pm25", 40.0),
+        "compute_summary": lambda: compute_summary(sub),
+        "try_build_pivot": lambda: try_build_pivot(sub),
+        "risk_counts": lambda: compute_risk_batch("pm25", sub["value"]),
+        "folium_map": lambda: build_map(sub),
+    }
+
+    results = []
+    for name, fn in cases.items():
+        seconds = timed(fn, repeat)
+        results.append({"name": name, "rows": n_rows, "seconds": seconds})
+        print(f"{name:>22} {n_rows:>12} {seconds:>10.4f}s")
+    return results
+
+
+def compare(current: list, baseline: list, threshold: float) -> list:
+    """
+    Cases slower than the baseline by more than threshold (0.2 = 20%).
+    """
+    before = {(r["name"], r["rows"]): r["seconds"] for r in baseline}
+    regressions = []
+    for r in current:
+        old = before.get((r["name"], r["rows"]))
+        if old and r["seconds"] > old * (1 + threshold):
+            regressions.append({**r, "baseline": old, "ratio": r["seconds"] / old})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--sensors", type=int, default=50, help="sensors per city")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workdir", help="where synthetic CSVs are written (default: temp dir)")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="lantern-bench-")
+    os.makedirs(workdir, exist_ok=True)
+
+    results = []
+    for n_rows in args.sizes:
+        results.extend(run_size(n_rows, args.sensors, workdir, args.repeat))
+
+    report = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "sensors": args.sensors,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['name']} @ {r['rows']}: "
+                  f"{r['baseline']:.4f}s -> {r['seconds']:.4f}s ({r['ratio']:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print("No regressions beyond threshold.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Time cold imports of the app and of each page, each in a fresh interpreter.
+
+Run from the repo root:
+    python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+# Prints seconds to import streamlit, then to load the page, plus which heavy
+# libraries ended up imported
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import streamlit
+base = time.perf_counter()
+from src.pages import load_page
+{load}
+done = time.perf_counter()
+print(json.dumps({{
+    "streamlit": base - start,
+    "page": done - base,
+    "heavy": [m for m in ("matplotlib", "folium", "streamlit_folium") if m in sys.modules],
+}}))
+"""
+
+
+def probe(title: str = None) -> dict:
+    load = f"load_page({title!r})" if title else "pass"
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(load=load)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    from src.pages import PAGES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per page (best is kept)")
+    args = parser.parse_args()
+
+    print(f"{'page':<22}{'streamlit s':>12}{'page s':>10}  heavy imports")
+    for title in [None] + list(PAGES):
+        runs = [probe(title) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r["page"])
+        name = title or "(registry only)"
+        print(f"{name:<22}{best['streamlit']:>12.3f}{best['page']:>10.3f}  {', '.join(best['heavy']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Synthetic OpenAQ exports matching the schemas of data/clean_openaq.csv
+(Kampala) and data/openaq_boston.csv (Boston).
+"""
+import numpy as np
+import pandas as pd
+
+KAMPALA_COLUMNS = [
+    "location_id", "location_name", "parameter", "value", "unit",
+    "datetimeutc", "datetimelocal", "latitude", "longitude",
+]
+
+BOSTON_COLUMNS = [
+    "location_id", "location_name", "parameter", "value", "unit",
+    "datetimeUtc", "datetimeLocal", "timezone", "latitude", "longitude",
+    "country_iso", "isMobile", "isMonitor", "owner_name", "provider",
+]
+
+# Per-schema layout: city center, UTC offset and timestamp formats
+SCHEMAS = {
+    "kampala": {
+        "columns": KAMPALA_COLUMNS,
+        "center": (0.31, 32.58),
+        "offset_hours": 3,
+        "utc_format": "%Y-%m-%d %H:%M:%S+00:00",
+        "local_format": "%Y-%m-%d %H:%M:%S+03:00",
+    },
+    "boston": {
+        "columns": BOSTON_COLUMNS,
+        "center": (42.35, -71.06),
+        "offset_hours": -5,
+        "utc_format": "%Y-%m-%dT%H:%M:%SZ",
+        "local_format": "%Y-%m-%dT%H:%M:%S-05:00",
+    },
+}
+
+
+def synthetic_chunk(schema: str, start: int, n_rows: int, n_sensors: int,
+                    seed: int = 0) -> pd.DataFrame:
+    """
+    Rows [start, start + n_rows) of a synthetic export.
+
+    Readings cycle through sensors and pm10/pm25, one hour apart per sensor.
+    """
+    spec = SCHEMAS[schema]
+    rng = np.random.default_rng(seed + start)
+    row = np.arange(start, start + n_rows)
+
+    sensor = row % n_sensors
+    parameter = np.where((row // n_sensors) % 2 == 0, "pm25", "pm10")
+    hour = row // (2 * n_sensors)
+    utc = pd.Timestamp("2020-01-01") + pd.to_timedelta(hour, unit="h")
+    local = utc + pd.Timedelta(hours=spec["offset_hours"])
+
+    # Daily cycle plus noise, with occasional spikes
+    value = 30 + 15 * np.sin(hour * 2 * np.pi / 24) + rng.gamma(2.0, 5.0, n_rows)
+    value[rng.random(n_rows) < 0.001] += 250
+
+    lat0, lon0 = spec["center"]
+    sensor_rng = np.random.default_rng(seed)
+    lat_offsets = sensor_rng.normal(0, 0.05, n_sensors)
+    lon_offsets = sensor_rng.normal(0, 0.05, n_sensors)
+
+    df = pd.DataFrame({
+        "location_id": 1_000_000 + sensor,
+        "location_name": pd.Series(sensor).map(lambda s: f"{schema}_sensor_{s}"),
+        "parameter": parameter,
+        "value": value,
+        "unit": "µg/m³",
+        spec["columns"][5]: utc.strftime(spec["utc_format"]),
+        spec["columns"][6]: local.strftime(spec["local_format"]),
+        "latitude": lat0 + lat_offsets[sensor],
+        "longitude": lon0 + lon_offsets[sensor],
+    })
+    if schema == "boston":
+        df["timezone"] = "America/New_York"
+        df["country_iso"] = np.nan
+        df["isMobile"] = np.nan
+        df["isMonitor"] = np.nan
+        df["owner_name"] = "Unknown Governmental Organization"
+        df["provider"] = "AirNow"
+    return df[spec["columns"]]
+
+
+def write_synthetic_csv(path: str, schema: str, n_rows: int, n_sensors: int = 50,
+                        chunk_rows: int = 1_000_000, seed: int = 0) -> str:
+    """
+    Write a synthetic export in chunks, so 1e8-row files fit in memory.
+    """
+    for start in range(0, n_rows, chunk_rows):
+        chunk = synthetic_chunk(schema, start, min(chunk_rows, n_rows - start), n_sensors, seed)
+        chunk.to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+    return path
@@ -1,5 +1,25 @@
-from . import home
-from . import explorer
-from . import risk
+import importlib
+import sys
 
-__all__ = ["home", "explorer", "risk"]
+# Page title -> module in this package. Modules are imported when a page is
+# first selected, so a process only loads matplotlib/folium for the pages
+# someone actually opens.
+PAGES = {
+    "Home": "home",
+    "Air Quality Explorer": "explorer",
+    "Asthma Risk": "risk",
+}
+
+
+def load_page(title: str):
+    """
+    Return the page module for a title, importing it on first use.
+    """
+    name = PAGES[title]
+    module = sys.modules.get(f"{__name__}.{name}")
+    if module is None:
+        module = importlib.import_module(f".{name}", __name__)
+    return module
+
+
+__all__ = list(PAGES.values())
@@ -1,10 +1,26 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 import folium
 from streamlit_folium import st_folium
 
-from src.utils.clean_data import load_openaq
+from src.utils import perf
+from src.utils.chart_cache import cached_chart
+from src.utils.datasets import (
+    dataset_version, get_city_data, get_city_index, get_events, get_heat_grid, get_rollups,
+    get_store_query,
+)
+from src.utils.downsample import downsample, point_budget
+from src.utils.export import EXPORT_FORMATS, export_bytes, export_frames
+from src.utils.rollups import rollup_monthly, rollup_summary
+from src.utils.sorted_index import SortedIndex
+from src.utils.store_query import StoreQuery
+
+# Newest readings shown in the raw data table (the download has them all)
+RAW_TABLE_ROWS = 1000
+
+RAW_COLUMNS = ["datetimelocal", "parameter", "value", "unit", "city", "latitude", "longitude"]
 
 
 # ======================================================
@@ -16,30 +32,25 @@ def load_city_data() -> pd.DataFrame:
     Load and combine Kampala and Boston air quality data.
     """
     # [DA1] Clean/manipulate data: convert timestamp strings to datetime
-    ug = load_openaq("data/clean_openaq.csv")
-    ug["city"] = "Kampala"
-    ug["datetimelocal"] = pd.to_datetime(
-        ug["datetimelocal"], format="mixed", errors="coerce"
-    )
-
-    bo = load_openaq("data/openaq_boston.csv")
-    bo["city"] = "Boston"
-    bo["datetimelocal"] = pd.to_datetime(
-        bo["datetimelocal"], format="mixed", errors="coerce"
-    )
-
-    df = pd.concat([ug, bo], ignore_index=True)
-    return df
+    # (parsed once at ingest to UTC; datetimelocal is the city's clock time)
+    return get_city_data()
 
 
 # [PY1] Function with two or more parameters (one with default value)
 # [DA4] Filter data by one condition
 # [DA5] Filter data by two or more conditions with AND
-def filter_data(df: pd.DataFrame, city: str, parameter: str, min_value: float = 0.0
+def filter_data(df, city: str, parameter: str, min_value: float = 0.0
                 ) -> pd.DataFrame:
     """
     Filter by city, parameter, and a minimum value threshold.
+
+    Given a SortedIndex, city and parameter resolve by binary search and only
+    that group is scanned for the threshold; given a StoreQuery, the filter
+    is pushed into the on-disk scan.
     """
+    if isinstance(df, (SortedIndex, StoreQuery)):
+        return df.query(city, parameter, min_value=min_value)
+
     mask = (
         (df["city"] == city) &
         (df["parameter"] == parameter) &
@@ -49,10 +60,15 @@ def filter_data(df: pd.DataFrame, city: str, parameter: str, min_value: float =
 
 
 # [PY2] Function that returns more than one value
-def compute_summary(sub: pd.DataFrame):
+def compute_summary(sub, city: str = None, parameter: str = None, min_value: float = None):
     """
     Compute max, min, and mean pollutant values.
+
+    Given a StoreQuery, the aggregation runs in the store for city and
+    parameter instead of over a loaded frame.
     """
+    if isinstance(sub, StoreQuery):
+        return sub.summary(city, parameter, min_value)
     max_val = sub["value"].max()
     min_val = sub["value"].min()
     mean_val = sub["value"].mean()
@@ -62,11 +78,14 @@ def compute_summary(sub: pd.DataFrame):
 
 # [PY3] Error checking with try/except
 # [DA6] Analyze data using a pivot-style aggregation
-def try_build_pivot(sub: pd.DataFrame) -> pd.DataFrame:
+def try_build_pivot(sub, city: str = None, parameter: str = None,
+                    min_value: float = None) -> pd.DataFrame:
     """
-    Build a simple monthly average table.
+    Build a simple monthly average table (in the store, given a StoreQuery).
     """
     try:
+        if isinstance(sub, StoreQuery):
+            return sub.monthly(city, parameter, min_value)
         temp = sub.dropna(subset=["datetimelocal"]).copy()
         temp["month"] = temp["datetimelocal"].dt.to_period("M").dt.to_timestamp()
         pivot = (
@@ -81,6 +100,113 @@ def try_build_pivot(sub: pd.DataFrame) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+def largest_rows(sub, n: int, by: str, city: str = None, parameter: str = None,
+                 min_value: float = None) -> pd.DataFrame:
+    """
+    The n rows with the largest `by` value, largest first (picked during the
+    scan, given a StoreQuery).
+    """
+    if isinstance(sub, StoreQuery):
+        return sub.largest(city, parameter, n, by, min_value)
+    return sub.nlargest(n, by)
+
+
+def aggregate_sensors(sub, city: str = None, parameter: str = None,
+                      min_value: float = None) -> pd.DataFrame:
+    """
+    Collapse readings to one row per sensor with summary stats (in the
+    store, given a StoreQuery).
+    """
+    if isinstance(sub, StoreQuery):
+        return sub.sensors(city, parameter, min_value)
+    located = sub.dropna(subset=["latitude", "longitude"])
+    return (
+        located.groupby("location_id", as_index=False, observed=True)
+        .agg(
+            location_name=("location_name", "first"),
+            latitude=("latitude", "mean"),
+            longitude=("longitude", "mean"),
+            readings=("value", "size"),
+            mean_value=("value", "mean"),
+            max_value=("value", "max"),
+        )
+    )
+
+
+def sensors_geojson(sensors: pd.DataFrame, unit: str) -> dict:
+    """
+    Build one GeoJSON point feature per sensor for a single map layer.
+    """
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [float(lon), float(lat)]},
+            "properties": {
+                "sensor": str(name),
+                "readings": int(count),
+                "mean": f"{mean:.2f} {unit}",
+                "max": f"{peak:.2f} {unit}",
+            },
+        }
+        for name, lat, lon, count, mean, peak in zip(
+            sensors["location_name"], sensors["latitude"], sensors["longitude"],
+            sensors["readings"], sensors["mean_value"], sensors["max_value"],
+        )
+    ]
+    return {"type": "FeatureCollection", "features": features}
+
+
+def heat_grid_rgba(values: np.ndarray, cmap: str = "YlOrRd", alpha: float = 0.55) -> np.ndarray:
+    """
+    Color an interpolated grid for an image overlay; empty cells stay clear.
+    """
+    finite = values[np.isfinite(values)]
+    low, high = (finite.min(), finite.max()) if finite.size else (0.0, 1.0)
+    scaled = (values - low) / (high - low) if high > low else np.zeros_like(values)
+    rgba = plt.get_cmap(cmap)(np.nan_to_num(scaled))
+    rgba[..., 3] = np.where(np.isfinite(values), alpha, 0.0)
+    return rgba
+
+
+def draw_line_chart(sub, city: str, parameter: str, unit: str, min_value: float = None):
+    """
+    Levels-over-time figure, downsampled to the chart's pixel width (during
+    the store scan, given a StoreQuery).
+    """
+    fig, ax = plt.subplots(figsize=(8, 4))
+    # Only draw as many points as the chart has pixels for (peaks are kept)
+    if isinstance(sub, StoreQuery):
+        line_x, line_y = sub.line_points(city, parameter, point_budget(fig), min_value)
+    else:
+        line_df = (
+            sub[["datetimelocal", "value"]]
+            .dropna()
+            .sort_values("datetimelocal")
+        )
+        line_x, line_y = downsample(
+            line_df["datetimelocal"].to_numpy(), line_df["value"].to_numpy(), point_budget(fig)
+        )
+    ax.plot(line_x, line_y, linewidth=2, color="steelblue")
+    ax.set_xlabel("Time")
+    ax.set_ylabel(f"{parameter.upper()} ({unit})")
+    ax.set_title(f"{parameter.upper()} Trend in {city}")
+    plt.xticks(rotation=45)
+    return fig
+
+
+def draw_monthly_chart(pivot_df: pd.DataFrame, city: str, parameter: str, unit: str):
+    """
+    Bar chart figure of monthly averages.
+    """
+    fig_bar, ax_bar = plt.subplots(figsize=(8, 3))
+    ax_bar.bar(pivot_df["month"].dt.strftime("%Y-%m"), pivot_df["avg_value"], color="darkorange")
+    ax_bar.set_xlabel("Month")
+    ax_bar.set_ylabel(f"Avg {parameter.upper()} ({unit})")
+    ax_bar.set_title(f"Average Monthly {parameter.upper()} Levels in {city}")
+    plt.xticks(rotation=45)
+    return fig_bar
+
+
 # [PY5] Dictionary using keys/values to describe pollutants
 PARAMETER_LABELS = {
     "pm25": "PM2.5 (fine particulate matter)",
@@ -99,7 +225,12 @@ def app():
     st.caption("Analyze pollution patterns for Kampala and Boston.")
 
     # [ST4] Customized layout & styling via description/metrics/sections
-    df = load_city_data()
+    # Sorted by city/parameter/time, so selections below are slices, not scans.
+    # With LANTERN_BACKEND=store, queries run against the on-disk store instead
+    index = get_store_query() or get_city_index()
+    out_of_core = isinstance(index, StoreQuery)
+    version = index.version() if out_of_core else dataset_version()
+    perf.lap("load data", rows=len(index))
 
     # -------------------------
     # FILTERS (WIDGETS)
@@ -107,32 +238,40 @@ def app():
     st.sidebar.subheader("Filters")
 
     # [ST1] Widget 1: selectbox for city
-    city = st.sidebar.selectbox("Select City", sorted(df["city"].unique()))
+    city = st.sidebar.selectbox("Select City", index.cities())
 
-    city_df = df[df["city"] == city].copy()
-    if city_df.empty:
+    city_parameters = index.parameters(city)
+    if not city_parameters:
         st.warning("No data available for this city.")
         return
 
     # [ST2] Widget 2: selectbox for pollutant
-    parameter = st.sidebar.selectbox("Select Pollutant", sorted(city_df["parameter"].unique()))
-    param_df = city_df[city_df["parameter"] == parameter].copy()
-    if param_df.empty:
+    parameter = st.sidebar.selectbox("Select Pollutant", city_parameters)
+    scope = index if out_of_core else index.query(city, parameter)
+    range_max, range_min, _, _ = compute_summary(scope, city, parameter)
+    if pd.isna(range_max):
         st.warning("No data available for this pollutant.")
         return
 
     # [ST3] Widget 3: slider for minimum value threshold
     min_val_threshold = st.sidebar.slider(
         "Minimum value to include",
-        float(param_df["value"].min()),
-        float(param_df["value"].max()),
-        float(param_df["value"].min()),
+        float(range_min),
+        float(range_max),
+        float(range_min),
     )
 
-    # Apply filter with minimum value
-    filtered = filter_data(df, city, parameter, min_val_threshold)
+    # Apply filter with minimum value. Out of core only the rows are counted
+    # here; each section below asks the store for the little it shows
+    if out_of_core:
+        filtered = index
+        n_rows = index.count(city, parameter, min_val_threshold)
+    else:
+        filtered = filter_data(index, city, parameter, min_val_threshold)
+        n_rows = len(filtered)
+    perf.lap("filter", rows=n_rows)
 
-    if filtered.empty:
+    if n_rows == 0:
         st.warning("No data after applying the selected filters.")
         return
 
@@ -141,7 +280,17 @@ def app():
     # ======================================================
     st.subheader("📊 Summary Metrics")
 
-    max_val, min_val, mean_val, unit = compute_summary(filtered)
+    # With no value threshold applied, the pre-computed rollups answer
+    # the metrics and monthly chart without rescanning raw rows (the store
+    # backend aggregates on disk instead)
+    use_rollups = not out_of_core and min_val_threshold <= range_min
+    rollups = get_rollups() if use_rollups else None
+
+    if use_rollups:
+        max_val, min_val, mean_val = rollup_summary(rollups, city, parameter)
+        unit = filtered["unit"].iloc[0]
+    else:
+        max_val, min_val, mean_val, unit = compute_summary(filtered, city, parameter, min_val_threshold)
 
     col1, col2, col3 = st.columns(3)
     col1.metric("Highest Value", f"{max_val:.2f} {unit}")
@@ -154,6 +303,7 @@ def app():
         f"{parameter.upper()} — {PARAMETER_LABELS.get(parameter, 'Air pollutant')}"
     ]
     st.info(" ".join(desc_list))
+    perf.lap("summary metrics", rows=n_rows)
 
     # ======================================================
     # VIZ 1: LINE CHART OVER TIME
@@ -161,49 +311,63 @@ def app():
     st.subheader(f"📈 {parameter.upper()} Levels Over Time — {city}")
     # [VIZ1] Line chart with time series
 
-    line_df = (
-        filtered[["datetimelocal", "value"]]
-        .dropna()
-        .sort_values("datetimelocal")
+    # Rendered once per dataset version and filter state, then served as PNG
+    chart_key = (version, city, parameter, min_val_threshold)
+    line_png = cached_chart(
+        ("line",) + chart_key,
+        lambda: draw_line_chart(filtered, city, parameter, unit, min_val_threshold),
     )
-
-    fig, ax = plt.subplots(figsize=(8, 4))
-    ax.plot(line_df["datetimelocal"], line_df["value"], linewidth=2, color="steelblue")
-    ax.set_xlabel("Time")
-    ax.set_ylabel(f"{parameter.upper()} ({unit})")
-    ax.set_title(f"{parameter.upper()} Trend in {city}")
-    plt.xticks(rotation=45)
-    st.pyplot(fig)
+    st.image(line_png, width="stretch")
+    perf.lap("line chart", rows=n_rows)
 
     # ======================================================
     # VIZ 2: BAR CHART OF MONTHLY AVERAGES
     # ======================================================
     st.subheader("📊 Monthly Average Levels")
     # [DA2] Sort data; [DA3] Find top/bottom values
-    pivot_df = try_build_pivot(filtered)
+    if use_rollups:
+        pivot_df = rollup_monthly(rollups, city, parameter)
+    else:
+        pivot_df = try_build_pivot(filtered, city, parameter, min_val_threshold)
 
     if not pivot_df.empty:
         # Sort by month for consistent bar order
         pivot_df = pivot_df.sort_values("month")
 
-        fig_bar, ax_bar = plt.subplots(figsize=(8, 3))
-        ax_bar.bar(pivot_df["month"].dt.strftime("%Y-%m"), pivot_df["avg_value"], color="darkorange")
-        ax_bar.set_xlabel("Month")
-        ax_bar.set_ylabel(f"Avg {parameter.upper()} ({unit})")
-        ax_bar.set_title(f"Average Monthly {parameter.upper()} Levels in {city}")
-        plt.xticks(rotation=45)
-        st.pyplot(fig_bar)
+        bar_png = cached_chart(
+            ("monthly",) + chart_key, lambda: draw_monthly_chart(pivot_df, city, parameter, unit)
+        )
+        st.image(bar_png, width="stretch")
         # [VIZ2] Second visualization: bar chart
     else:
         st.info("Not enough data to compute monthly averages.")
+    perf.lap("monthly chart", rows=len(pivot_df))
 
     # Show top 5 highest pollution records table
     st.markdown("#### 🌡️ Top 5 Highest Recorded Values")
-    top5 = filtered.nlargest(5, "value")  # [DA3] Find top n largest values
+    top5 = largest_rows(filtered, 5, "value", city, parameter, min_val_threshold)  # [DA3] Find top n largest values
     st.dataframe(
         top5[["datetimelocal", "value", "unit", "latitude", "longitude"]],
-        use_container_width=True,
+        width="stretch",
     )
+    perf.lap("top values table", rows=n_rows)
+
+    # Spikes and stuck sensors flagged at ingest; read from the event table
+    st.markdown("#### 🚨 Flagged Events")
+    events = get_events(city, parameter)
+    if not events.empty:
+        st.dataframe(
+            events.head(10)[["time", "kind", "location_id", "value", "baseline", "score"]].rename(columns={
+                "time": "Time (UTC)", "kind": "Event", "location_id": "Sensor",
+                "value": "Value", "baseline": "Baseline", "score": "Score",
+            }),
+            hide_index=True,
+            width="stretch",
+        )
+        st.caption("Spikes score in standard deviations above the recent baseline; flatlines in identical readings.")
+    else:
+        st.info("No spikes or stuck sensors flagged for this pollutant.")
+    perf.lap("flagged events", rows=len(events))
 
     # ======================================================
     # MAP: FOLIUM SENSOR LOCATIONS
@@ -211,43 +375,75 @@ def app():
     st.subheader("🗺️ Sensor Locations")
     # [VIZ4 MAP] Interactive map
 
-    coords = filtered[["latitude", "longitude"]].dropna()
-
-    if not coords.empty:
-        lat_center = coords["latitude"].mean()
-        lon_center = coords["longitude"].mean()
-
-        fmap = folium.Map(location=[lat_center, lon_center], zoom_start=11)
+    # One feature per sensor, so the payload grows with sensors, not readings
+    sensors = aggregate_sensors(filtered, city, parameter, min_val_threshold)
+
+    if not sensors.empty:
+        fmap = folium.Map(zoom_start=11)
+        south_west = [float(sensors["latitude"].min()), float(sensors["longitude"].min())]
+        north_east = [float(sensors["latitude"].max()), float(sensors["longitude"].max())]
+        fmap.fit_bounds([south_west, north_east], max_zoom=13)
+
+        # Interpolated surface of every sensor's average, built once per dataset
+        grid = None if out_of_core else get_heat_grid(city, parameter)
+        if grid is not None and len(sensors) > 1:
+            folium.raster_layers.ImageOverlay(
+                heat_grid_rgba(grid["values"]),
+                bounds=grid["bounds"],
+                name=f"Interpolated average {parameter.upper()}",
+            ).add_to(fmap)
 
-        for _, row in coords.iterrows():
-            folium.CircleMarker(
-                location=[row["latitude"], row["longitude"]],
+        folium.GeoJson(
+            sensors_geojson(sensors, unit),
+            name="Sensors",
+            marker=folium.CircleMarker(
                 radius=5,
                 color="crimson",
                 fill=True,
                 fill_opacity=0.8,
-            ).add_to(fmap)
+            ),
+            tooltip=folium.GeoJsonTooltip(
+                fields=["sensor", "readings", "mean", "max"],
+                aliases=["Sensor", "Readings", "Average", "Highest"],
+            ),
+        ).add_to(fmap)
+        folium.LayerControl().add_to(fmap)
 
         st_folium(fmap, width=750, height=500)
     else:
         st.info("No coordinates available for map display.")
+    perf.lap("map", rows=len(sensors))
 
     # ======================================================
     # RAW DATA TABLE + DOWNLOAD
     # ======================================================
     st.subheader("📄 Raw Data Table")
 
-    clean_table = filtered[
-        ["datetimelocal", "parameter", "value", "unit", "city", "latitude", "longitude"]
-    ].sort_values("datetimelocal", ascending=False)
+    # Newest readings only; the table would otherwise ship every row to the browser
+    clean_table = largest_rows(filtered, RAW_TABLE_ROWS, "datetimelocal", city, parameter, min_val_threshold)
+
+    st.dataframe(clean_table[RAW_COLUMNS], width="stretch")
+    if n_rows > len(clean_table):
+        st.caption(f"Showing the newest {len(clean_table):,} of {n_rows:,} readings; download for all of them.")
+    perf.lap("raw data table", rows=len(clean_table))
+
+    export_format = st.radio("Download format", list(EXPORT_FORMATS), horizontal=True)
+    extension, mime = EXPORT_FORMATS[export_format]
 
-    st.dataframe(clean_table, use_container_width=True)
+    # The file is only built when the button is clicked, in chunks (straight
+    # from the store's batches, in storage order, when out of core)
+    def download_bytes():
+        if out_of_core:
+            parts = (part[RAW_COLUMNS] for part in index.iter_query(city, parameter, min_val_threshold))
+            return export_frames(parts, export_format)
+        newest_first = filtered[RAW_COLUMNS].sort_values("datetimelocal", ascending=False)
+        return export_bytes(newest_first, export_format)
 
-    csv = clean_table.to_csv(index=False).encode("utf-8")
     st.download_button(
-        label="⬇️ Download Filtered Data as CSV",
-        data=csv,
-        file_name=f"{city}_{parameter}_filtered_air_quality.csv",
-        mime="text/csv",
+        label=f"⬇️ Download Filtered Data as {export_format}",
+        data=download_bytes,
+        file_name=f"{city}_{parameter}_filtered_air_quality.{extension}",
+        mime=mime,
     )
+    perf.lap("download", rows=n_rows)
 
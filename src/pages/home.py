@@ -2,8 +2,6 @@ import streamlit as st
 
 def app():
 
-    st.set_page_config(layout="wide")
-
     # =========================
     # PREMIUM HERO SECTION
     # =========================
@@ -1,60 +1,36 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-from src.utils.clean_data import load_openaq
-
-risk_levels = ["Good", "Satisfactory", "Moderately polluted", "Poor", "Very poor", "Severe"]
-
-def compute_risk(parameter: str, value: float) -> str:
-    #PM25 threshold amounts from
-    #https://www.airveda.com/blog/Understanding-Particulate-Matter-and-Its-Associated-Health-Impact
-    if parameter == "pm25":
-        if value >= 250:
-            return risk_levels[5]  # Severe
-        elif value >= 121:
-            return risk_levels[4]  # Very poor
-        elif value >= 91:
-            return risk_levels[3]  # Poor
-        elif value >= 61:
-            return risk_levels[2]  # Moderately polluted
-        elif value >= 31:
-            return risk_levels[1]  # Satisfactory
-        elif value < 0:
-            return "Invalid Air Quality Value"
-        return risk_levels[0]  # Good
-
-    #PM10 threshold amounts from
-    #https://www.airveda.com/blog/Understanding-Particulate-Matter-and-Its-Associated-Health-Impact
-    if parameter == "pm10":
-        if value >= 430:
-            return risk_levels[5]  # Severe
-        elif value >= 351:
-            return risk_levels[4]  # Very poor
-        elif value >= 251:
-            return risk_levels[3]  # Poor
-        elif value >= 101:
-            return risk_levels[2]  # Moderately polluted
-        elif value >= 51:
-            return risk_levels[1]  # Satisfactory
-        elif value < 0:
-            return "Invalid Air Quality Value"
-        return risk_levels[0]  # Good
-
-    return "Parameter not recognized"
-
-#Load data for cities
+from src.utils import perf
+from src.utils.chart_cache import cached_chart
+from src.utils.datasets import (
+    dataset_version, get_city_data, get_city_index, get_current_conditions, get_events,
+    get_latest_exposure, get_sensor_sites, get_store_query,
+)
+from src.utils.exposure import MAX_AGE_HOURS
+#Risk scale lives in utils so headless reports share it; re-exported here
+from src.utils.risk_scale import (
+    INVALID_LEVEL, RISK_BREAKPOINTS, RISK_CATEGORIES, UNKNOWN_LEVEL,
+    compute_risk, compute_risk_batch, risk_levels,
+)
+from src.utils.spatial import SensorIndex, sensor_sites
+from src.utils.store_query import StoreQuery
+
+#Averaging basis the risk level can use -> column of the exposure table
+EXPOSURE_BASIS = {
+    "24-hour average": "mean_24h",
+    "8-hour average": "mean_8h",
+    "NowCast": "nowcast",
+    "1-hour average": "mean_1h",
+}
+
+#Hours of recent history read from the store: every current sensor's
+#latest hour plus a full 24-hour average behind it
+RECENT_HOURS = 2 * MAX_AGE_HOURS
+
+#Load data for cities (shared, process-wide cached frame)
 def load_city_data():
-
-    #Load for Kampala
-    ug = load_openaq("data/clean_openaq.csv")
-    ug["city"] = "Kampala"
-
-    #Load for Boston
-    bo = load_openaq("data/openaq_boston.csv")
-    bo["city"] = "Boston"
-
-    #Return a combined dataframe for all cities
-    return pd.concat([ug, bo], ignore_index=True)
+    return get_city_data()
 
 #Define main function of the webpage
 def app():
@@ -62,43 +38,83 @@ def app():
     #Set title
     st.title("Asthma Risk")
 
-    #Create dataframe of the cities
-    df = load_city_data()
+    #Cities indexed by city/parameter/time, so picking a subset is a slice.
+    #With LANTERN_BACKEND=store, queries run against the on-disk store instead
+    index = get_store_query() or get_city_index()
+    out_of_core = isinstance(index, StoreQuery)
+    perf.lap("load data", rows=len(index))
+
+    #Current conditions in every city, read from the snapshot table
+    conditions = get_current_conditions()
+    st.subheader("Current Conditions")
+    overview = conditions.reset_index()[
+        ["city", "parameter", "latest_value", "unit", "level", "latest_time", "sensors"]
+    ]
+    st.dataframe(
+        overview.rename(columns={
+            "city": "City", "parameter": "Pollutant", "latest_value": "Latest",
+            "unit": "Unit", "level": "Risk Level", "latest_time": "Updated (UTC)", "sensors": "Sensors",
+        }),
+        hide_index=True,
+    )
+    perf.lap("current conditions", rows=len(overview))
 
-    #Let user select city, and create subdataframe for that city only
-    city = st.selectbox("City", sorted(df["city"].unique()))
-    city_df = df[df["city"] == city].copy()
+    #Let user select city
+    city = st.selectbox("City", index.cities())
+    city_parameters = index.parameters(city)
 
     #If missing data, return warning
-    if city_df.empty:
+    if not city_parameters:
         st.warning("No data for selected city.")
         return
 
-    #Let user choose parameter (pm10, pm25) and create further subdataframe for it
-    parameter = st.selectbox("Pollutant", sorted(city_df["parameter"].unique()))
-    subset = city_df[city_df["parameter"] == parameter]
+    #Let user choose parameter (pm10, pm25)
+    parameter = st.selectbox("Pollutant", city_parameters)
 
     #If missing data, return warning
-    if subset.empty:
+    if (city, parameter) not in conditions.index:
         st.warning("No data for selected pollutant.")
         return
 
-    #Get most recent available reading
-    latest = subset.sort_values("timestamp").iloc[-1]
+    #Latest reading, time span and range are kept per series at ingest,
+    #so no history is sorted or scanned here
+    current = conditions.loc[(city, parameter)]
+    latest_value = float(current["latest_value"])
+    first_time, last_time = current["first_time"], current["latest_time"]
+    perf.lap("latest reading", rows=int(current["sensors"]))
+
+    #Readings for the averages and counts below; only recent ones out of core
+    if out_of_core:
+        subset = index.query(city, parameter, start=last_time - pd.Timedelta(hours=RECENT_HOURS))
+    else:
+        subset = index.query(city, parameter)
 
     #Show to the screen latest reading and units, to the nearst 2 decimal places
     st.subheader("Latest Reading")
     st.metric(
         label=f"{parameter.upper()} (µg/m³):",
-        value=f"{latest['value']:.2f}",
+        value=f"{latest_value:.2f}",
     )
 
+    #Flag spikes and stuck sensors detected at ingest in the last day
+    recent_events = get_events(city, parameter)
+    recent_events = recent_events[recent_events["time"] > last_time - pd.Timedelta(hours=24)]
+    if not recent_events.empty:
+        kinds = recent_events["kind"].value_counts()
+        st.warning(
+            "Flagged in the last 24 hours: "
+            + ", ".join(f"{count} {kind}{'s' if count > 1 else ''}" for kind, count in kinds.items())
+        )
+
     #How does this reading compare to the others available?
-    times_higher = latest["value"] / subset["value"].min()
-    percent_of_max = (subset["value"].max() - latest["value"]) / subset["value"].max()
+    times_higher = latest_value / current["min_value"]
+    percent_of_max = (current["max_value"] - latest_value) / current["max_value"]
 
-    st.write(f"This reading is {times_higher:.2f} times higher than the lowest reading of the past {len(subset['value'])} hours.")
-    st.write(f"This reading is {percent_of_max:.0%} of the highest reading in the past {len(subset['value'])} hours.")
+    #Hours actually covered by the readings (there can be gaps), not the row count
+    hours_covered = int((last_time - first_time) / pd.Timedelta(hours=1)) + 1
+
+    st.write(f"This reading is {times_higher:.2f} times higher than the lowest reading of the past {hours_covered} hours.")
+    st.write(f"This reading is {percent_of_max:.0%} of the highest reading in the past {hours_covered} hours.")
 
     #Create dictionary of colors for the risk levels
     risk_colors = {
@@ -110,8 +126,46 @@ def app():
         "Severe": "red",
     }
 
-    #Compute risk level based on latest reading, write risk in color
-    risk = compute_risk(parameter, latest["value"])
+    #Rolling exposure of every current sensor at its latest hour (computed for all
+    #sensors at once; out of core, read from the table appends maintain in the store)
+    if out_of_core:
+        exposure = index.latest_exposure(city, parameter)
+    else:
+        exposure = get_latest_exposure()
+        exposure = exposure[(exposure["city"] == city) & (exposure["parameter"] == parameter)]
+    perf.lap("exposure", rows=len(exposure))
+
+    #Let user choose the averaging period, averaged across the city's sensors
+    basis = st.selectbox("Risk based on", list(EXPOSURE_BASIS))
+    column = EXPOSURE_BASIS[basis]
+    exposure_value = exposure[column].mean()
+    basis_note = f"{basis}: {{:.2f}} µg/m³ across {len(exposure)} sensor(s)."
+
+    #Optionally estimate for the user's own location from the nearest sensors
+    sites = sensor_sites(subset) if out_of_core else get_sensor_sites()
+    sites = sites[(sites["city"] == city) & (sites["parameter"] == parameter)]
+    located = sites.merge(exposure[["location_id", column]], on="location_id").dropna(subset=[column])
+    if not located.empty and st.checkbox("Estimate for my location"):
+        my_lat = st.number_input("Latitude", -90.0, 90.0, float(located["latitude"].mean()), format="%.5f")
+        my_lon = st.number_input("Longitude", -180.0, 180.0, float(located["longitude"].mean()), format="%.5f")
+        sensor_index = SensorIndex(located["latitude"], located["longitude"])
+        distance, nearest = sensor_index.nearest(my_lat, my_lon)
+        exposure_value = sensor_index.idw(my_lat, my_lon, located[column])[0]
+        basis_note = f"{basis} at your location: {{:.2f}} µg/m³."
+        st.caption(
+            f"Interpolated from {len(located)} sensor(s); nearest is "
+            f"{located['location_name'].iloc[nearest[0, 0]]} ({distance[0, 0]:.1f} km away)."
+        )
+        perf.lap("location estimate", rows=len(located))
+
+    if pd.isna(exposure_value):
+        exposure_value = latest_value
+        st.caption(f"Not enough hourly data for the {basis.lower()}; using the latest reading.")
+    else:
+        st.caption(basis_note.format(exposure_value))
+
+    #Compute risk level based on the averaged exposure, write risk in color
+    risk = compute_risk(parameter, exposure_value)
     color = risk_colors[risk]
     st.subheader(f"Current Asthma Risk Level: :{color}[{risk}]")
 
@@ -148,39 +202,38 @@ def app():
     st.write(f"General recommendation for today: {recs[risk]}")
     st.write(f"Your recommendation for right now: {recs[personal_risk]}")
 
-    risk_counts = {
-        "Good": 0,
-        "Satisfactory": 0,
-        "Moderately polluted": 0,
-        "Poor": 0,
-        "Very poor": 0,
-        "Severe": 0,
-    }
-
-    #Count risk levels in chosen subset
-    for index, row in subset.iterrows():
-        level = compute_risk(parameter, row["value"])
-        if level in risk_counts:
-            risk_counts[level] += 1
+    #Count readings (not hours) at each risk level, every sensor included
+    if out_of_core:
+        level_counts = index.risk_counts(city, parameter)
+    else:
+        _, level_counts = compute_risk_batch(parameter, subset["value"])
+    risk_counts = level_counts[risk_levels].to_dict()
+    perf.lap("risk counts", rows=len(subset))
 
     #Show table of risk levels and counts
     risk_counts_df = pd.DataFrame(list(risk_counts.items()), columns=["Risk Level", "Count"])
     st.subheader("Risk Levels Count")
-    st.write(f"**Table:** Hours at each risk level in the past {len(subset)} hours")
+    st.write(f"**Table:** Readings at each risk level in the past {hours_covered} hours, across all sensors")
     st.dataframe(risk_counts_df)
 
     #Bar graph of risk levels, color coded
-    st.write(f"**Graph:** Hours at each risk level in the past {len(subset)} hours, color coded for severity")
-    bar_risk_chart, axes_bar = plt.subplots()
-    axes_bar.bar(risk_counts_df["Risk Level"], risk_counts_df["Count"], color=[risk_colors[level] for level in risk_counts_df["Risk Level"]])
-    axes_bar.set_xlabel("Risk Level")
-    axes_bar.set_ylabel("Count")
-    axes_bar.set_title("Risk Levels Count")
-
-    #Shrink graph to fit better on site
-    bar_chart_loc = axes_bar.get_position()
-    axes_bar.set_position([bar_chart_loc.x0, bar_chart_loc.y0, bar_chart_loc.width, bar_chart_loc.height * 0.5])
-
-    #Rotate x axis so text doesn't overlap, ha = horizontal alignment
-    plt.xticks(rotation=45, ha='right')
-    st.pyplot(bar_risk_chart)
\ No newline at end of file
+    st.write(f"**Graph:** Readings at each risk level in the past {hours_covered} hours across all sensors, color coded for severity")
+    def draw_risk_chart():
+        bar_risk_chart, axes_bar = plt.subplots()
+        axes_bar.bar(risk_counts_df["Risk Level"], risk_counts_df["Count"], color=[risk_colors[level] for level in risk_counts_df["Risk Level"]])
+        axes_bar.set_xlabel("Risk Level")
+        axes_bar.set_ylabel("Count")
+        axes_bar.set_title("Risk Levels Count")
+
+        #Shrink graph to fit better on site
+        bar_chart_loc = axes_bar.get_position()
+        axes_bar.set_position([bar_chart_loc.x0, bar_chart_loc.y0, bar_chart_loc.width, bar_chart_loc.height * 0.5])
+
+        #Rotate x axis so text doesn't overlap, ha = horizontal alignment
+        plt.xticks(rotation=45, ha='right')
+        return bar_risk_chart
+
+    #Reuse the rendered chart for the same data, city and pollutant (no threshold here)
+    risk_png = cached_chart(("risk_levels", index.version() if out_of_core else dataset_version(), city, parameter, None), draw_risk_chart)
+    st.image(risk_png)
+    perf.lap("risk chart", rows=len(risk_counts_df))
\ No newline at end of file
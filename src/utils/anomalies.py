@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+
+SERIES_KEYS = ["city", "location_id", "parameter"]
+
+# EWMA smoothing per reading (~ a day of hourly readings) and the z-score,
+# against the baseline before a reading, that flags it as a spike
+EWMA_ALPHA = 0.05
+SPIKE_Z = 4.0
+# Readings a series needs before its baseline is trusted
+WARMUP_READINGS = 24
+# Identical consecutive readings that mark a stuck sensor
+FLATLINE_READINGS = 6
+
+STATE_COLUMNS = SERIES_KEYS + [
+    "count", "mean", "var", "last_time", "last_value", "run_length", "run_start",
+]
+EVENT_COLUMNS = SERIES_KEYS + ["time", "kind", "value", "baseline", "score"]
+
+
+def empty_state() -> pd.DataFrame:
+    return pd.DataFrame({
+        "city": pd.Series(dtype="str"),
+        "location_id": pd.Series(dtype="int64"),
+        "parameter": pd.Series(dtype="str"),
+        "count": pd.Series(dtype="int64"),
+        "mean": pd.Series(dtype="float64"),
+        "var": pd.Series(dtype="float64"),
+        "last_time": pd.Series(dtype="datetime64[ns, UTC]"),
+        "last_value": pd.Series(dtype="float64"),
+        "run_length": pd.Series(dtype="int64"),
+        "run_start": pd.Series(dtype="datetime64[ns, UTC]"),
+    })
+
+
+def empty_events() -> pd.DataFrame:
+    return pd.DataFrame({
+        "city": pd.Series(dtype="str"),
+        "location_id": pd.Series(dtype="int64"),
+        "parameter": pd.Series(dtype="str"),
+        "time": pd.Series(dtype="datetime64[ns, UTC]"),
+        "kind": pd.Series(dtype="str"),
+        "value": pd.Series(dtype="float32"),
+        "baseline": pd.Series(dtype="float32"),
+        "score": pd.Series(dtype="float32"),
+    })
+
+
+def _ewm(inputs: np.ndarray, series: np.ndarray, seeds: np.ndarray, seeded: np.ndarray) -> np.ndarray:
+    """
+    y_t = (1 - a) * y_{t-1} + a * x_t within each series (rows grouped by
+    series, in time order). Seeded series start from their seed; others
+    start from their first input.
+    """
+    first = np.r_[True, series[1:] != series[:-1]]
+    lead = first & seeded
+    # One extra row in front of each seeded series carries its seed
+    extended = np.insert(inputs, np.flatnonzero(lead), seeds[lead])
+    groups = np.insert(series, np.flatnonzero(lead), series[lead])
+    smoothed = (
+        pd.Series(extended)
+        .groupby(groups, sort=False)
+        .ewm(alpha=EWMA_ALPHA, adjust=False)
+        .mean()
+        .reset_index(level=0, drop=True)
+        .sort_index()
+        .to_numpy()
+    )
+    keep = np.ones(len(extended), dtype=bool)
+    keep[np.flatnonzero(lead) + np.arange(lead.sum())] = False
+    return smoothed[keep]
+
+
+def _before(after: np.ndarray, first: np.ndarray, seeds: np.ndarray) -> np.ndarray:
+    # Value before each row: the seed for a series' first row, else the previous row
+    return np.where(first, seeds, np.r_[np.nan, after[:-1]])
+
+
+def detect(readings: pd.DataFrame, state: pd.DataFrame = None):
+    """
+    Run the spike and flatline detectors over newly ingested readings.
+
+    Each series carries O(1) state between calls (EWMA mean and variance,
+    last reading, current run of identical values), so readings can be fed
+    in ingest batches. Readings at or before a series' last processed time
+    are skipped. Returns (events, new_state).
+    """
+    state = empty_state() if state is None else state
+    rows = readings.dropna(subset=["value"])[SERIES_KEYS + ["timestamp", "value"]]
+    rows = rows.astype({"city": str, "parameter": str, "location_id": "int64", "value": "float64"})
+    rows = rows.merge(state, on=SERIES_KEYS, how="left")
+    rows = rows[rows["last_time"].isna() | (rows["timestamp"] > rows["last_time"])]
+    if rows.empty:
+        return empty_events(), state
+    rows = rows.sort_values(SERIES_KEYS + ["timestamp"], kind="stable", ignore_index=True)
+
+    series = rows.groupby(SERIES_KEYS, sort=False).ngroup().to_numpy()
+    first = np.r_[True, series[1:] != series[:-1]]
+    seeded = rows["count"].notna().to_numpy()
+    values = rows["value"].to_numpy()
+    times = rows["timestamp"]
+
+    position = rows.groupby(series, sort=False).cumcount().to_numpy()
+    count_before = rows["count"].fillna(0).to_numpy("int64") + position
+
+    # EWMA mean; a new series starts at its first value
+    seed_mean = rows["mean"].to_numpy("float64")
+    mean_after = _ewm(values, series, seed_mean, seeded)
+    mean_before = _before(mean_after, first, np.where(seeded, seed_mean, np.nan))
+
+    # EW variance v_t = (1 - a) * (v_{t-1} + a * d_t^2), d_t = x_t - mean before,
+    # i.e. an EWMA of (1 - a) * d_t^2; a new series starts at 0
+    deviation = values - mean_before
+    var_inputs = np.where(np.isnan(deviation), 0.0, (1 - EWMA_ALPHA) * deviation ** 2)
+    seed_var = rows["var"].to_numpy("float64")
+    var_after = _ewm(var_inputs, series, seed_var, seeded)
+    var_before = _before(var_after, first, np.where(seeded, seed_var, np.nan))
+
+    std_before = np.sqrt(var_before)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(std_before > 0, deviation / std_before, 0.0)
+    spike = (count_before >= WARMUP_READINGS) & (z >= SPIKE_Z)
+
+    # Runs of identical values, continuing a series' carried run
+    previous = _before(values, first, rows["last_value"].to_numpy("float64"))
+    new_run = ~(values == previous)
+    run_id = np.cumsum(new_run | first)
+    continues = first & ~new_run
+    run_pos = rows.groupby(run_id, sort=False).cumcount().to_numpy() + 1
+    carried = pd.Series(np.where(continues, rows["run_length"].fillna(0), 0).astype("int64"))
+    run_length = carried.groupby(run_id, sort=False).transform("first").to_numpy() + run_pos
+    run_start = rows["run_start"].where(continues, times).groupby(run_id, sort=False).transform("first")
+    flat = run_length == FLATLINE_READINGS
+
+    events = pd.concat([
+        pd.DataFrame({
+            **{key: rows.loc[spike, key] for key in SERIES_KEYS},
+            "time": times[spike], "kind": "spike", "value": values[spike],
+            "baseline": mean_before[spike], "score": z[spike],
+        }),
+        pd.DataFrame({
+            **{key: rows.loc[flat, key] for key in SERIES_KEYS},
+            "time": run_start[flat], "kind": "flatline", "value": values[flat],
+            "baseline": values[flat], "score": run_length[flat],
+        }),
+    ], ignore_index=True)
+    events = events.astype({"value": "float32", "baseline": "float32", "score": "float32"})
+    events = events.sort_values(["time"] + SERIES_KEYS, ignore_index=True)[EVENT_COLUMNS]
+
+    last = np.r_[series[1:] != series[:-1], True]
+    updated = pd.DataFrame({
+        **{key: rows.loc[last, key].to_numpy() for key in SERIES_KEYS},
+        "count": count_before[last] + 1,
+        "mean": mean_after[last],
+        "var": var_after[last],
+        "last_time": times[last].to_numpy(),
+        "last_value": values[last],
+        "run_length": run_length[last],
+        "run_start": run_start[last].to_numpy(),
+    })
+    untouched = state.merge(updated[SERIES_KEYS], on=SERIES_KEYS, how="left", indicator=True)
+    untouched = untouched[untouched["_merge"] == "left_only"].drop(columns="_merge")
+    new_state = pd.concat([untouched, updated], ignore_index=True)[STATE_COLUMNS]
+    return events, new_state
@@ -1,22 +1,68 @@
-import pandas as pd
-
-def load_city(path, city_name):
-    df = pd.read_csv(path)
-    df["city"] = city_name
-    # Normalize datetime column
-    df["datetime"] = pd.to_datetime(df["datetimelocal"])
-    return df[[
+import argparse
+import os
+
+from src.utils import datasets
+from src.utils.datasets import ROLLUP_DIR, dataset_version, get_city_data, rollup_path
+from src.utils.ingest import ingest_cities
+from src.utils.master_store import STORE_DIR, append_incremental
+from src.utils.rollups import build_rollups
+from src.utils.shared_dataset import SHARED_DIR, publish_shared
+
+# Full-precision CSV of every city (the app reads the sources, not this)
+MASTER_PATH = "data/air_quality_master.csv"
+
+
+def build_master_incremental():
+    # Only rows past each series' high-water mark are appended to the store
+    written = append_incremental(get_city_data())
+    print(f"Appended {written} new rows to {STORE_DIR}")
+
+
+def build_master(registry: dict = None, master_path: str = MASTER_PATH, rollup_dir: str = ROLLUP_DIR,
+                 shared_dir: str = SHARED_DIR, use_cache: bool = True):
+    # Same cities as the pages, through the registry, but at full precision:
+    # float32 is only for the in-memory frame
+    master = ingest_cities(registry, compact=False, use_cache=use_cache).rename(
+        columns={"datetimelocal": "datetime"}
+    )[[
         "city", "location_id", "location_name", "parameter",
-        "value", "unit", "datetime", "latitude", "longitude"
+        "value", "unit", "datetime", "timezone", "latitude", "longitude"
     ]]
+    master.to_csv(master_path, index=False)
+    print(f"Master dataset created: {master_path}")
+
+    # The configured cities share the pages' cached frame; another registry
+    # (e.g. the benchmark's synthetic cities) is ingested here
+    frame = get_city_data() if registry is None else ingest_cities(registry, use_cache=use_cache)
+    version = dataset_version(registry)
 
-def build_master():
-    kampala = load_city("data/clean_openaq.csv", "Kampala")
-    boston = load_city("data/openaq_boston.csv", "Boston")
+    # Hour/day/month rollups read by the explorer's metrics and monthly chart
+    try:
+        os.makedirs(rollup_dir, exist_ok=True)
+        path = rollup_path(version, rollup_dir)
+        build_rollups(frame).to_parquet(path, index=False)
+        print(f"Rollup store created: {path}")
+    except ImportError:
+        pass
 
-    master = pd.concat([kampala, boston], ignore_index=True)
-    master.to_csv("data/air_quality_master.csv", index=False)
-    print("Master dataset created: data/air_quality_master.csv")
+    # Memory-mapped copy for LANTERN_BACKEND=shared workers; published last
+    # so the rollups for this version already exist when workers swap
+    manifest = publish_shared(frame, version, shared_dir)
+    print(f"Shared dataset published: {shared_dir}/{manifest['file']}")
 
 if __name__ == "__main__":
-    build_master()
+    parser = argparse.ArgumentParser(description="Build the combined air quality dataset.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="append only new readings to the partitioned store instead of rebuilding",
+    )
+    args = parser.parse_args()
+
+    # Always build from the sources, even when the shell sets LANTERN_BACKEND
+    datasets.BACKEND = "memory"
+
+    if args.incremental:
+        build_master_incremental()
+    else:
+        build_master()
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+
+import pandas as pd
+
+# Parsed frames are kept next to the raw data so every rerun can skip the CSV parse
+CACHE_DIR = Path("data/.cache")
+
+
+def _file_hash(path) -> str:
+    """
+    Hash the raw bytes of a source file (used when its mtime changes).
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_version(path) -> dict:
+    """
+    Cheap version stamp of a source file: modification time and size.
+    """
+    stat = os.stat(path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def _cache_paths(path, tag: str):
+    # Keyed on the resolved path, so same-named sources in different
+    # directories get their own entries (the stem is kept for readability)
+    source = Path(path).resolve()
+    key = hashlib.sha1(str(source).encode("utf-8")).hexdigest()[:10]
+    name = f"{source.stem}-{key}.{tag}"
+    return CACHE_DIR / f"{name}.parquet", CACHE_DIR / f"{name}.json"
+
+
+def _tmp_path(path: Path) -> Path:
+    # Unique per writer, so concurrent processes never share a temp file
+    return path.with_name(f"{path.name}.tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}")
+
+
+def _write_meta(meta_path: Path, meta: dict):
+    tmp_path = _tmp_path(meta_path)
+    tmp_path.write_text(json.dumps(meta))
+    os.replace(tmp_path, meta_path)
+
+
+def _is_fresh(path, meta_path) -> bool:
+    """
+    Check a cache entry against its source file.
+
+    A matching mtime/size is trusted as-is. If they differ the content hash
+    decides, so touching or re-copying an unchanged file keeps the cache.
+    """
+    if not meta_path.exists():
+        return False
+    try:
+        meta = json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        return False
+
+    current = source_version(path)
+    if meta.get("mtime_ns") == current["mtime_ns"] and meta.get("size") == current["size"]:
+        return True
+    if meta.get("size") != current["size"] or meta.get("sha1") != _file_hash(path):
+        return False
+
+    # Same content with a new mtime: refresh the stamp so the next check is cheap
+    meta.update(current)
+    try:
+        _write_meta(meta_path, meta)
+    except OSError:
+        pass
+    return True
+
+
+def cached_frame(path, tag: str, builder) -> pd.DataFrame:
+    """
+    Return builder(path), reading it from the Parquet cache when the source
+    file is unchanged and writing it there otherwise.
+    """
+    data_path, meta_path = _cache_paths(path, tag)
+
+    if data_path.exists() and _is_fresh(path, meta_path):
+        try:
+            return pd.read_parquet(data_path)
+        except (ImportError, OSError, ValueError):
+            # Missing Parquet engine or corrupt file: fall back to parsing
+            pass
+
+    df = builder(path)
+
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        meta_path.unlink(missing_ok=True)
+        tmp_path = _tmp_path(data_path)
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, data_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        meta = source_version(path)
+        meta["sha1"] = _file_hash(path)
+        _write_meta(meta_path, meta)
+    except Exception:
+        # Caching is best effort; the parsed frame is still valid
+        pass
+
+    return df
+
+
+def clear_cache():
+    """
+    Remove every cached frame.
+    """
+    if CACHE_DIR.exists():
+        for entry in CACHE_DIR.iterdir():
+            entry.unlink()
@@ -0,0 +1,91 @@
+import io
+import threading
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+
+# Total bytes of PNGs kept in memory across all sessions of a process
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class ChartCache:
+    """
+    LRU cache of rendered chart images, capped by total size in bytes.
+
+    Keys should identify everything a chart depends on, e.g.
+    (chart kind, dataset version, city, parameter, threshold).
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            png = self._items.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def put(self, key, png: bytes):
+        with self._lock:
+            if key in self._items:
+                self.size -= len(self._items.pop(key))
+            if len(png) > self.max_bytes:
+                return
+            self._items[key] = png
+            self.size += len(png)
+            # Evict least recently used charts until under the cap
+            while self.size > self.max_bytes:
+                _, old = self._items.popitem(last=False)
+                self.size -= len(old)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_cache = ChartCache()
+
+
+def figure_png(fig) -> bytes:
+    """
+    Rasterize a figure the way st.pyplot does, then close it.
+    """
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=200, bbox_inches="tight")
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def cached_chart(key, draw, cache: ChartCache = None) -> bytes:
+    """
+    PNG bytes for key, calling draw() -> matplotlib Figure only on a miss.
+    """
+    cache = cache or _cache
+    png = cache.get(key)
+    if png is None:
+        png = figure_png(draw())
+        cache.put(key, png)
+    return png
+
+
+def chart_cache_stats() -> dict:
+    return _cache.stats()
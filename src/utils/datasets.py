@@ -0,0 +1,291 @@
+import hashlib
+import os
+import threading
+import time
+
+import pandas as pd
+
+from src.utils.anomalies import detect
+from src.utils.cache import source_version
+from src.utils.exposure import compute_exposure, latest_exposure
+from src.utils.ingest import CITY_CONFIG, ingest_cities, load_city_registry
+from src.utils.rollups import build_rollups
+from src.utils.shared_dataset import manifest_version, map_shared, read_manifest
+from src.utils.snapshot import build_snapshot, current_conditions
+from src.utils.sorted_index import SortedIndex
+from src.utils.spatial import heat_grid, sensor_sites
+from src.utils.store_query import StoreQuery, store_available
+
+# build_master writes rollups here, one file per dataset version
+ROLLUP_DIR = "data/rollups"
+
+# Seconds a loaded frame is served before the sources are reloaded
+DEFAULT_TTL = 600
+
+# "store" serves the pages from the partitioned master store on disk
+# (out of core) instead of the in-memory combined frame; "shared" maps the
+# frame build_master published, so worker processes share one copy
+BACKEND = os.environ.get("LANTERN_BACKEND", "memory")
+
+# One combined frame per process, shared by every page and session
+_lock = threading.Lock()
+_entry = {"key": None, "loaded_at": 0.0, "frame": None}
+_rollups = {"version": None, "frame": None}
+_index = {"frame": None, "index": None}
+_exposure = {"frame": None, "table": None, "latest": None}
+_spatial = {"frame": None, "sites": None, "grids": {}}
+_store = {"version": None, "query": None}
+# Tables maintained as readings are ingested (snapshot.py, anomalies.py)
+_live = {"frame": None, "version": None, "snapshot": None, "conditions": None, "events": None}
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def source_key(registry: dict = None) -> tuple:
+    """
+    Version of the city config and every source file (of the configured
+    cities unless a registry is given), used to key the cached frame.
+    """
+    config = source_version(CITY_CONFIG)
+    key = [(CITY_CONFIG, config["mtime_ns"], config["size"])]
+    for city, entry in (registry or load_city_registry()).items():
+        for path in entry["sources"]:
+            version = source_version(path)
+            key.append((city, path, version["mtime_ns"], version["size"]))
+    return tuple(key)
+
+
+def _shared_manifest():
+    # Manifest of the published frame in shared mode, else None
+    if BACKEND != "shared" or manifest_version() is None:
+        return None
+    return read_manifest()
+
+
+def dataset_version(registry: dict = None) -> str:
+    """
+    Short stable id of the current source versions (in shared mode, of the
+    published frame).
+    """
+    manifest = _shared_manifest() if registry is None else None
+    if manifest is not None:
+        return manifest["version"]
+    return hashlib.sha1(repr(source_key(registry)).encode("utf-8")).hexdigest()[:12]
+
+
+def get_city_data(ttl: float = DEFAULT_TTL) -> pd.DataFrame:
+    """
+    Return the combined air quality frame for all cities.
+
+    The frame is loaded once per process and reused until the TTL expires
+    or a source file changes. In shared mode it is memory-mapped from the
+    published file instead and swapped when a new version is published.
+    Callers must treat it as read-only.
+    """
+    manifest = _shared_manifest()
+    if manifest is not None:
+        return _get_shared_frame(manifest)
+
+    key = source_key()
+    with _lock:
+        fresh = time.monotonic() - _entry["loaded_at"] < ttl
+        if _entry["frame"] is not None and _entry["key"] == key and fresh:
+            _stats["hits"] += 1
+            return _entry["frame"]
+
+        _stats["misses"] += 1
+        frame = ingest_cities()
+        _entry.update(key=key, loaded_at=time.monotonic(), frame=frame)
+        return frame
+
+
+def _get_shared_frame(manifest: dict) -> pd.DataFrame:
+    key = ("shared", manifest["version"], manifest["file"])
+    with _lock:
+        if _entry["frame"] is not None and _entry["key"] == key:
+            _stats["hits"] += 1
+            return _entry["frame"]
+
+        _stats["misses"] += 1
+        # One reference swap; sessions holding the old frame keep their map
+        frame = map_shared(manifest)
+        _entry.update(key=key, loaded_at=time.monotonic(), frame=frame)
+        return frame
+
+
+def get_city_index(ttl: float = DEFAULT_TTL) -> SortedIndex:
+    """
+    Return the combined frame as a SortedIndex, rebuilt only when the
+    underlying frame is reloaded.
+    """
+    frame = get_city_data(ttl)
+    with _lock:
+        if _index["frame"] is not frame:
+            _index.update(frame=frame, index=SortedIndex(frame))
+        return _index["index"]
+
+
+def _exposure_entry(ttl: float) -> dict:
+    frame = get_city_data(ttl)
+    with _lock:
+        if _exposure["frame"] is not frame:
+            table = compute_exposure(frame)
+            _exposure.update(frame=frame, table=table, latest=latest_exposure(table))
+        return dict(_exposure)
+
+
+def get_exposure(ttl: float = DEFAULT_TTL) -> pd.DataFrame:
+    """
+    Hourly rolling averages and NowCast for every sensor (see exposure.py).
+    """
+    return _exposure_entry(ttl)["table"]
+
+
+def get_latest_exposure(ttl: float = DEFAULT_TTL) -> pd.DataFrame:
+    """
+    Latest hour of exposure averages per (city, location_id, parameter).
+    """
+    return _exposure_entry(ttl)["latest"]
+
+
+def _spatial_entry(ttl: float) -> dict:
+    frame = get_city_data(ttl)
+    with _lock:
+        if _spatial["frame"] is not frame:
+            _spatial.update(frame=frame, sites=sensor_sites(frame), grids={})
+        return _spatial
+
+
+def get_sensor_sites(ttl: float = DEFAULT_TTL) -> pd.DataFrame:
+    """
+    Distinct sensor coordinates per (city, parameter, location_id), with
+    each sensor's mean reading.
+    """
+    return _spatial_entry(ttl)["sites"]
+
+
+def get_heat_grid(city: str, parameter: str, ttl: float = DEFAULT_TTL) -> dict:
+    """
+    Interpolated surface of sensor means for one city and pollutant,
+    computed once per loaded frame (see spatial.heat_grid).
+    """
+    entry = _spatial_entry(ttl)
+    key = (city, parameter)
+    grid = entry["grids"].get(key)
+    if grid is None:
+        sites = entry["sites"]
+        sites = sites[(sites["city"] == city) & (sites["parameter"] == parameter)]
+        grid = heat_grid(sites) if not sites.empty else None
+        with _lock:
+            entry["grids"][key] = grid
+    return grid
+
+
+def get_store_query():
+    """
+    StoreQuery over the partitioned master store when LANTERN_BACKEND=store
+    and the store exists, otherwise None (pages use the in-memory frame).
+    """
+    if BACKEND != "store" or not store_available():
+        return None
+    with _lock:
+        if _store["query"] is None or _store["query"].version() != _store["version"]:
+            # Re-list part files after an append
+            query = StoreQuery()
+            _store.update(version=query.version(), query=query)
+        return _store["query"]
+
+
+def _live_entry(ttl: float) -> dict:
+    store = get_store_query()
+    # Keyed on the store version, or on the loaded frame itself
+    frame = None if store is not None else get_city_data(ttl)
+    version = store.version() if store is not None else None
+    with _lock:
+        if _live["frame"] is not frame or _live["version"] != version or _live["snapshot"] is None:
+            if store is not None:
+                snapshot, events = store.snapshot(), store.events()
+            else:
+                snapshot, (events, _) = build_snapshot(frame), detect(frame)
+            _live.update(frame=frame, version=version, snapshot=snapshot,
+                         conditions=current_conditions(snapshot), events=events)
+        return dict(_live)
+
+
+def get_snapshot(ttl: float = DEFAULT_TTL) -> pd.DataFrame:
+    """
+    Latest reading and min/max/count per (city, location_id, parameter).
+    """
+    return _live_entry(ttl)["snapshot"]
+
+
+def get_current_conditions(ttl: float = DEFAULT_TTL) -> pd.DataFrame:
+    """
+    Current reading, range and risk level per (city, parameter), indexed
+    by (city, parameter) for direct lookups.
+    """
+    return _live_entry(ttl)["conditions"]
+
+
+def get_events(city: str = None, parameter: str = None, ttl: float = DEFAULT_TTL) -> pd.DataFrame:
+    """
+    Spike and flatline events flagged at ingest (see anomalies.py),
+    optionally for one city and pollutant, newest first.
+    """
+    events = _live_entry(ttl)["events"]
+    if city is not None:
+        events = events[events["city"] == city]
+    if parameter is not None:
+        events = events[events["parameter"] == parameter]
+    return events.sort_values("time", ascending=False, kind="stable")
+
+
+def rollup_path(version: str, rollup_dir: str = ROLLUP_DIR) -> str:
+    return os.path.join(rollup_dir, f"rollups-{version}.parquet")
+
+
+def get_rollups() -> pd.DataFrame:
+    """
+    Return the hour/day/month rollup store for the current sources.
+
+    Reads the store written by build_master when it matches the current
+    source versions, otherwise builds it once from the combined frame.
+    """
+    version = dataset_version()
+    if _rollups["version"] == version:
+        return _rollups["frame"]
+
+    path = rollup_path(version)
+    frame = None
+    if os.path.exists(path):
+        try:
+            frame = pd.read_parquet(path)
+        except (ImportError, OSError, ValueError):
+            frame = None
+    if frame is None:
+        frame = build_rollups(get_city_data())
+
+    _rollups.update(version=version, frame=frame)
+    return frame
+
+
+def invalidate():
+    """
+    Drop the cached frame so the next call reloads the sources.
+    """
+    with _lock:
+        _entry.update(key=None, loaded_at=0.0, frame=None)
+        _rollups.update(version=None, frame=None)
+        _index.update(frame=None, index=None)
+        _exposure.update(frame=None, table=None, latest=None)
+        _spatial.update(frame=None, sites=None, grids={})
+        _store.update(version=None, query=None)
+        _live.update(frame=None, version=None, snapshot=None, conditions=None, events=None)
+        _stats["invalidations"] += 1
+
+
+def cache_stats() -> dict:
+    """
+    Hit/miss/invalidation counters since the process started.
+    """
+    with _lock:
+        return dict(_stats)
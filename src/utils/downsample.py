@@ -0,0 +1,114 @@
+import numpy as np
+
+
+def point_budget(fig, points_per_pixel: int = 2) -> int:
+    """
+    Number of points worth drawing across a figure's pixel width.
+    """
+    return int(fig.get_figwidth() * fig.dpi) * points_per_pixel
+
+
+def minmax_indices(x, y, n_out: int) -> np.ndarray:
+    """
+    Keep the lowest and highest point of each of n_out/2 equal-count buckets.
+
+    Every local extreme survives, so spikes are never hidden.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    n_buckets = max(n_out // 2, 1)
+    if n <= n_out:
+        return np.arange(n)
+
+    size = -(-n // n_buckets)
+    n_buckets = -(-n // size)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    buckets = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+
+    lows = offsets + np.nanargmin(buckets, axis=1)
+    highs = offsets + np.nanargmax(buckets, axis=1)
+    return np.unique(np.concatenate([lows, highs]))
+
+
+def minmax_bucket_indices(y, bucket) -> np.ndarray:
+    """
+    Positions of the lowest and highest y within each bucket label.
+
+    Buckets can be any labels (e.g. equal-time bins), so batches can be
+    reduced separately and their survivors reduced again.
+    """
+    y = np.asarray(y, dtype=float)
+    bucket = np.asarray(bucket)
+    if len(y) == 0:
+        return np.arange(0)
+    order = np.lexsort((y, bucket))
+    starts = np.r_[True, bucket[order][1:] != bucket[order][:-1]]
+    ends = np.r_[starts[1:], True]
+    return np.unique(np.concatenate([order[starts], order[ends]]))
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets selection of n_out points.
+
+    LTTB keeps the visual shape; the global min and max are added back so
+    the highest reading is always drawn.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    # First and last points are fixed; the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    picked = np.empty(n_out, dtype=int)
+    picked[0] = 0
+    picked[-1] = n - 1
+
+    prev = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third vertex
+        if i + 2 < len(edges):
+            nxt_start, nxt_stop = edges[i + 1], edges[i + 2]
+        else:
+            nxt_start, nxt_stop = n - 1, n
+        avg_x = x[nxt_start:nxt_stop].mean()
+        avg_y = y[nxt_start:nxt_stop].mean()
+
+        area = np.abs(
+            (x[prev] - avg_x) * (y[start:stop] - y[prev])
+            - (x[prev] - x[start:stop]) * (avg_y - y[prev])
+        )
+        prev = start + int(np.argmax(area))
+        picked[i + 1] = prev
+
+    extremes = [int(np.nanargmax(y)), int(np.nanargmin(y))]
+    return np.unique(np.concatenate([picked, extremes]))
+
+
+# Pluggable decimation methods, selected by name
+DOWNSAMPLERS = {
+    "minmax": minmax_indices,
+    "lttb": lttb_indices,
+}
+
+
+def downsample(x, y, n_out: int, method: str = "minmax"):
+    """
+    Reduce a time series (sorted by x) to about n_out points.
+
+    x may be datetimes; they are compared as integer nanoseconds.
+    Returns the kept x and y values.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    if len(y) <= n_out:
+        return x, y
+
+    x_num = x.astype("datetime64[ns]").astype("int64") if np.issubdtype(x.dtype, np.datetime64) else x
+    keep = DOWNSAMPLERS[method](x_num, y, n_out)
+    return x[keep], y[keep]
@@ -0,0 +1,73 @@
+import gzip
+import io
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Rows converted to text at a time; bounds the temporary CSV string
+CHUNK_ROWS = 50_000
+
+# Label -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "CSV (gzip)": ("csv.gz", "application/gzip"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def iter_csv_chunks(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS, header: bool = True):
+    """
+    Yield the frame as UTF-8 CSV bytes, chunk_rows rows at a time.
+    """
+    for start in range(0, max(len(df), 1), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        yield chunk.to_csv(index=False, header=header and start == 0).encode("utf-8")
+
+
+def _plain_table(frame: pd.DataFrame) -> pa.Table:
+    # Decode categoricals, whose dictionaries differ between parts
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    schema = pa.schema([
+        field.with_type(field.type.value_type) if pa.types.is_dictionary(field.type) else field
+        for field in table.schema
+    ])
+    return table.cast(schema)
+
+
+def export_frames(frames, fmt: str = "CSV", chunk_rows: int = CHUNK_ROWS) -> bytes:
+    """
+    Serialize consecutive parts of one table (e.g. store batches) for
+    download in one of EXPORT_FORMATS, one part at a time.
+    """
+    buf = io.BytesIO()
+    if fmt == "Parquet":
+        writer = None
+        for frame in frames:
+            table = _plain_table(frame)
+            if writer is None:
+                writer = pq.ParquetWriter(buf, table.schema)
+            writer.write_table(table.cast(writer.schema))
+        if writer is not None:
+            writer.close()
+    elif fmt in ("CSV", "CSV (gzip)"):
+        out = gzip.GzipFile(fileobj=buf, mode="wb") if fmt == "CSV (gzip)" else buf
+        for i, frame in enumerate(frames):
+            for part in iter_csv_chunks(frame, chunk_rows, header=i == 0):
+                out.write(part)
+        if out is not buf:
+            out.close()
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return buf.getvalue()
+
+
+def export_bytes(df: pd.DataFrame, fmt: str = "CSV", chunk_rows: int = CHUNK_ROWS) -> bytes:
+    """
+    Serialize a frame for download in one of EXPORT_FORMATS.
+    """
+    if fmt == "Parquet":
+        buf = io.BytesIO()
+        df.to_parquet(buf, index=False)
+        return buf.getvalue()
+    return export_frames([df], fmt, chunk_rows)
@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+
+SERIES_KEYS = ["city", "location_id", "parameter"]
+
+# Rolling averages on the hourly grid: hours -> minimum valid hours (75%)
+WINDOWS = {"mean_1h": (1, 1), "mean_8h": (8, 6), "mean_24h": (24, 18)}
+
+# NowCast looks back 12 hours; PM uses a minimum weight factor of 0.5
+NOWCAST_HOURS = 12
+NOWCAST_MIN_WEIGHT = 0.5
+
+# A sensor whose latest hour is older than this, relative to the newest hour
+# of its city and pollutant, has stopped reporting and no longer counts
+MAX_AGE_HOURS = max(window for window, _ in WINDOWS.values())
+
+EXPOSURE_COLUMNS = SERIES_KEYS + ["hour", "sum", "count"] + list(WINDOWS) + ["nowcast"]
+
+
+def hourly_sums(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sum and count of readings per series and UTC hour.
+    """
+    hours = df["timestamp"].dt.floor("h")
+    return (
+        df.assign(hour=hours, value=df["value"].astype("float64"))
+        .groupby(SERIES_KEYS + ["hour"], observed=True)["value"]
+        .agg(["sum", "count"])
+        .reset_index()
+    )
+
+
+def _fill_grid(hourly: pd.DataFrame) -> pd.DataFrame:
+    # Every hour between a series' first and last reading, gaps as count 0
+    spans = hourly.groupby(SERIES_KEYS, observed=True)["hour"].agg(["min", "max"]).reset_index()
+    lengths = (((spans["max"] - spans["min"]) // pd.Timedelta(hours=1)) + 1).to_numpy("int64")
+    grid = spans.loc[spans.index.repeat(lengths), SERIES_KEYS].reset_index(drop=True)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    grid["hour"] = (
+        pd.DatetimeIndex(spans["min"]).repeat(lengths)
+        + pd.to_timedelta(offsets, unit="h")
+    )
+    grid["pos"] = offsets
+
+    grid = grid.merge(hourly, on=SERIES_KEYS + ["hour"], how="left")
+    grid["sum"] = grid["sum"].fillna(0.0)
+    grid["count"] = grid["count"].fillna(0).astype("int64")
+    return grid
+
+
+def _rolling_mean(sums, counts, pos, window: int, min_hours: int) -> np.ndarray:
+    """
+    Mean of readings over the last `window` hours of each series, using
+    cumulative sums over the contiguous hourly grid.
+    """
+    hourly_mean = np.where(counts > 0, sums / np.maximum(counts, 1), 0.0)
+    has_data = (counts > 0).astype("int64")
+    cs = np.concatenate([[0.0], np.cumsum(hourly_mean)])
+    cn = np.concatenate([[0], np.cumsum(has_data)])
+
+    i = np.arange(len(sums))
+    start = i - np.minimum(pos, window - 1)
+    total = cs[i + 1] - cs[start]
+    hours = cn[i + 1] - cn[start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(hours >= min_hours, total / hours, np.nan)
+
+
+def _nowcast(sums, counts, pos) -> np.ndarray:
+    """
+    EPA NowCast over the last 12 hourly means of each series.
+    """
+    hourly_mean = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    n = len(hourly_mean)
+    lags = np.full((n, NOWCAST_HOURS), np.nan)
+    for k in range(NOWCAST_HOURS):
+        ok = pos >= k
+        lags[ok, k] = hourly_mean[np.flatnonzero(ok) - k]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        c_min = np.nanmin(np.where(np.isnan(lags), np.inf, lags), axis=1)
+        c_max = np.nanmax(np.where(np.isnan(lags), -np.inf, lags), axis=1)
+        weight = np.where(c_max > 0, c_min / c_max, 1.0)
+    weight = np.maximum(weight, NOWCAST_MIN_WEIGHT)
+
+    powers = weight[:, None] ** np.arange(NOWCAST_HOURS)
+    valid = ~np.isnan(lags)
+    numerator = np.where(valid, powers * lags, 0.0).sum(axis=1)
+    denominator = np.where(valid, powers, 0.0).sum(axis=1)
+
+    # NowCast needs at least 2 of the 3 most recent hours
+    enough = valid[:, :3].sum(axis=1) >= 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(enough, numerator / denominator, np.nan)
+
+
+def _exposure_from_hourly(hourly: pd.DataFrame, nowcast: bool = True) -> pd.DataFrame:
+    grid = _fill_grid(hourly)
+    sums = grid["sum"].to_numpy()
+    counts = grid["count"].to_numpy()
+    pos = grid["pos"].to_numpy()
+
+    for name, (window, min_hours) in WINDOWS.items():
+        grid[name] = _rolling_mean(sums, counts, pos, window, min_hours)
+    grid["nowcast"] = _nowcast(sums, counts, pos) if nowcast else np.nan
+    return grid[EXPOSURE_COLUMNS]
+
+
+def compute_exposure(df: pd.DataFrame, nowcast: bool = True) -> pd.DataFrame:
+    """
+    Hourly 1h/8h/24h averages and NowCast for every sensor at once.
+
+    Time gaps are kept as empty hours on the grid, so windows always span
+    real clock time rather than a number of readings. With nowcast=False
+    the (costlier) NowCast column is left empty.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=EXPOSURE_COLUMNS)
+    return _exposure_from_hourly(hourly_sums(df), nowcast)
+
+
+def update_exposure(table: pd.DataFrame, new_readings: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fold newly arrived readings into an exposure table.
+
+    Only the touched series are recomputed, from their last stored hour (or
+    their first new hour, if earlier) on, with the 23 stored hours before it
+    as window history. The gap up to the new hours is re-gridded as empty
+    hours, so the result equals compute_exposure on all the readings.
+    """
+    if new_readings.empty:
+        return table
+    if table.empty:
+        return compute_exposure(new_readings)
+
+    new_hourly = hourly_sums(new_readings)
+    first_new = new_hourly.groupby(SERIES_KEYS, observed=True)["hour"].min().rename("first_new")
+    last_stored = table.groupby(SERIES_KEYS, observed=True)["hour"].max().rename("last_stored")
+    start = first_new.to_frame().join(last_stored, how="left")
+    start = start.min(axis=1).rename("start").reset_index()
+
+    lookback = pd.Timedelta(hours=max(window for window, _ in WINDOWS.values()) - 1)
+    marked = table.merge(start, on=SERIES_KEYS, how="left")
+    touched = marked["start"].notna()
+    history = marked[touched & (marked["hour"] >= marked["start"] - lookback)]
+    keep = marked[~touched | (marked["hour"] < marked["start"])].drop(columns="start")
+
+    combined = (
+        pd.concat([history[SERIES_KEYS + ["hour", "sum", "count"]], new_hourly], ignore_index=True)
+        .groupby(SERIES_KEYS + ["hour"], observed=True)[["sum", "count"]].sum()
+        .reset_index()
+    )
+    # History hours are recomputed with their window history cut short; only
+    # hours from each series' start on are kept
+    fresh = _exposure_from_hourly(combined).merge(start, on=SERIES_KEYS)
+    fresh = fresh[fresh["hour"] >= fresh["start"]].drop(columns="start")
+
+    return (
+        pd.concat([keep, fresh], ignore_index=True)
+        .sort_values(SERIES_KEYS + ["hour"], ignore_index=True)[EXPOSURE_COLUMNS]
+    )
+
+
+def latest_exposure(table: pd.DataFrame, max_age_hours: int = MAX_AGE_HOURS) -> pd.DataFrame:
+    """
+    Most recent hour with readings for each current series.
+
+    Series whose latest hour falls outside the max_age_hours window ending
+    at the newest hour of their city and pollutant are left out, so a dead
+    sensor's last reading does not count as current conditions.
+    """
+    with_data = table[table["count"] > 0]
+    last = with_data.groupby(SERIES_KEYS, observed=True)["hour"].idxmax()
+    latest = with_data.loc[last]
+    newest = latest.groupby(["city", "parameter"], observed=True)["hour"].transform("max")
+    current = latest["hour"] > newest - pd.Timedelta(hours=max_age_hours)
+    return latest[current].reset_index(drop=True)
@@ -0,0 +1,204 @@
+import math
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.utils.clean_data import PM_PARAMETERS
+from src.utils.timestamps import normalize_timestamps
+
+OPENAQ_URL = "https://api.openaq.org/v3"
+
+# Responses worth retrying: rate limited or a transient server error
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Same columns (and order) load_openaq produces for a cleaned export
+OPENAQ_COLUMNS = [
+    "location_id", "location_name", "parameter", "value", "unit",
+    "datetimeutc", "datetimelocal", "latitude", "longitude",
+]
+
+
+class OpenAQClient:
+    """
+    Pooled OpenAQ v3 client with rate-limit-aware retries.
+
+    One requests.Session is shared by all worker threads, so connections
+    are reused instead of opened per request.
+    """
+
+    def __init__(self, api_key: str = None, base_url: str = OPENAQ_URL,
+                 max_workers: int = 8, max_retries: int = 5, page_size: int = 1000,
+                 timeout: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.page_size = page_size
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        api_key = api_key or os.environ.get("OPENAQ_API_KEY")
+        if api_key:
+            self.session.headers["X-API-Key"] = api_key
+
+    def close(self):
+        self.session.close()
+
+    def _retry_delay(self, response, attempt: int) -> float:
+        # Server-provided wait first, then exponential backoff with jitter
+        if response is not None:
+            for header in ("Retry-After", "X-Ratelimit-Reset"):
+                value = response.headers.get(header)
+                if value:
+                    try:
+                        return max(float(value), 0.0)
+                    except ValueError:
+                        pass
+        return min(2 ** attempt, 30) * (0.5 + random.random() / 2)
+
+    def get(self, path: str, params: dict = None) -> dict:
+        """
+        GET a JSON endpoint, retrying rate limits and transient failures.
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response.json()
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+            if attempt == self.max_retries:
+                response.raise_for_status()
+            time.sleep(self._retry_delay(response, attempt))
+        raise RuntimeError(f"Retries exhausted for {url}")
+
+    def location(self, location_id: int) -> dict:
+        results = self.get(f"locations/{location_id}").get("results", [])
+        if not results:
+            raise ValueError(f"OpenAQ location {location_id} not found")
+        return results[0]
+
+    def measurements_page(self, sensor_id: int, page: int, date_from: str = None,
+                          date_to: str = None) -> dict:
+        """
+        One page of a sensor's measurements: the response, with its meta.
+        """
+        params = {"limit": self.page_size, "page": page}
+        if date_from:
+            params["datetime_from"] = date_from
+        if date_to:
+            params["datetime_to"] = date_to
+        return self.get(f"sensors/{sensor_id}/measurements", params)
+
+
+def _page_count(response: dict, page_size: int):
+    # meta.found is an exact count when the API knows it, else a string
+    # such as ">1000"; None means pages must be followed one at a time
+    found = (response.get("meta") or {}).get("found")
+    if isinstance(found, int):
+        return max(math.ceil(found / page_size), 1)
+    return None
+
+
+def _normalize(location: dict, sensor: dict, measurements: list) -> pd.DataFrame:
+    # Map v3 JSON onto the cleaned-export columns, then parse times once
+    coords = location.get("coordinates") or {}
+    parameter = sensor["parameter"]
+    records = []
+    for m in measurements:
+        period = (m.get("period") or {}).get("datetimeFrom") or {}
+        point = m.get("coordinates") or coords
+        records.append({
+            "location_id": location["id"],
+            "location_name": location.get("name"),
+            "parameter": parameter["name"].lower().strip(),
+            "value": m.get("value"),
+            "unit": parameter.get("units"),
+            "datetimeutc": period.get("utc"),
+            "datetimelocal": period.get("local"),
+            "latitude": point.get("latitude"),
+            "longitude": point.get("longitude"),
+        })
+    df = pd.DataFrame(records, columns=OPENAQ_COLUMNS)
+    return normalize_timestamps(df)
+
+
+def iter_openaq_api(location_ids, date_from: str = None, date_to: str = None,
+                    parameters=PM_PARAMETERS, client: OpenAQClient = None):
+    """
+    Fetch many locations concurrently, yielding one normalized frame per
+    sensor as soon as its pages are in.
+
+    Once a sensor's first page reports how many measurements it has
+    (meta.found), its remaining pages are fetched concurrently too; when
+    the count is unknown they are followed one at a time.
+    """
+    own_client = client is None
+    client = client or OpenAQClient()
+    try:
+        with ThreadPoolExecutor(max_workers=client.max_workers) as pool:
+            locations = list(pool.map(client.location, location_ids))
+
+            # future -> (location, sensor, page); sensor id -> page -> rows
+            jobs, pages, pending, totals = {}, {}, {}, {}
+
+            def submit(location, sensor, page):
+                future = pool.submit(client.measurements_page, sensor["id"], page, date_from, date_to)
+                jobs[future] = (location, sensor, page)
+                pending[sensor["id"]] = pending.get(sensor["id"], 0) + 1
+
+            for location in locations:
+                for sensor in location.get("sensors", []):
+                    if sensor["parameter"]["name"].lower() in parameters:
+                        pages[sensor["id"]] = {}
+                        submit(location, sensor, 1)
+
+            while jobs:
+                done, _ = wait(jobs, return_when=FIRST_COMPLETED)
+                for future in done:
+                    location, sensor, page = jobs.pop(future)
+                    key = sensor["id"]
+                    response = future.result()
+                    results = response.get("results", [])
+                    pages[key][page] = results
+                    pending[key] -= 1
+
+                    if page == 1:
+                        totals[key] = _page_count(response, client.page_size)
+                        for later in range(2, (totals[key] or 1) + 1):
+                            submit(location, sensor, later)
+                    # Past the counted pages (or with no count), a full page
+                    # means there may be another
+                    if len(results) == client.page_size and page >= (totals[key] or page):
+                        submit(location, sensor, page + 1)
+
+                    if pending[key] == 0:
+                        rows = [row for _, part in sorted(pages.pop(key).items()) for row in part]
+                        yield _normalize(location, sensor, rows)
+    finally:
+        if own_client:
+            client.close()
+
+
+def fetch_openaq(location_ids, date_from: str = None, date_to: str = None,
+                 parameters=PM_PARAMETERS, client: OpenAQClient = None) -> pd.DataFrame:
+    """
+    Fetch measurements for many locations into one frame shaped like
+    load_openaq's output (sorted by timestamp).
+    """
+    frames = list(iter_openaq_api(location_ids, date_from, date_to, parameters, client))
+    if not frames:
+        return normalize_timestamps(pd.DataFrame(columns=OPENAQ_COLUMNS))
+    df = pd.concat(frames, ignore_index=True)
+    return df.sort_values("timestamp", kind="stable", ignore_index=True)
@@ -0,0 +1,99 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from src.utils.clean_data import DEFAULT_CHUNKSIZE, load_openaq
+from src.utils.schema import enforce_schema
+from src.utils.timestamps import localize
+
+# City name -> {"sources": [csv paths], "timezone": IANA name,
+#               optional "chunksize": rows per streamed chunk}
+CITY_CONFIG = "config/cities.json"
+
+# Sources larger than this are streamed in chunks even without a chunksize
+STREAM_ABOVE_BYTES = 256 * 1024 * 1024
+
+# Below this many source bytes, cities are parsed inline: a pool's start-up
+# costs more than it saves
+PARALLEL_ABOVE_BYTES = 64 * 1024 * 1024
+
+# Workers are started fresh rather than forked: the Streamlit server is
+# multi-threaded, and a forked child can inherit a lock held by another thread
+POOL_CONTEXT = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def load_city_registry(path: str = CITY_CONFIG) -> dict:
+    """
+    Read the city registry config.
+    """
+    with open(path, encoding="utf-8") as f:
+        registry = json.load(f)
+
+    for city, entry in registry.items():
+        if not entry.get("sources"):
+            raise ValueError(f"City {city!r} has no sources in {path}")
+        entry.setdefault("timezone", "UTC")
+        entry.setdefault("chunksize", None)
+    return registry
+
+
+def source_chunksize(path: str, entry: dict):
+    """
+    Rows per chunk to stream a source with, or None to parse it whole.
+    """
+    if entry.get("chunksize"):
+        return int(entry["chunksize"])
+    if os.path.getsize(path) > STREAM_ABOVE_BYTES:
+        return DEFAULT_CHUNKSIZE
+    return None
+
+
+def load_city(city: str, entry: dict, compact: bool = True, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Parse every source file of one city into a single frame.
+    """
+    frames = [
+        load_openaq(path, use_cache=use_cache, chunksize=source_chunksize(path, entry))
+        for path in entry["sources"]
+    ]
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    df["city"] = city
+    # Local clock time comes from the parsed UTC timestamp, not the strings
+    df = localize(df, entry["timezone"])
+    return enforce_schema(df) if compact else df
+
+
+def _load_city_args(args):
+    return load_city(*args)
+
+
+def ingest_cities(registry: dict = None, workers: int = None,
+                  compact: bool = True, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Parse all cities into one frame, in parallel across a process pool
+    when the sources are large enough to be worth it (or workers is given).
+
+    With compact=True (the default) the frame follows the canonical schema:
+    only the needed columns, categoricals and 32-bit numbers. With
+    use_cache=False every source is parsed from its CSV.
+    """
+    if registry is None:
+        registry = load_city_registry()
+    if workers is None:
+        total = sum(os.path.getsize(path) for entry in registry.values() for path in entry["sources"])
+        workers = min(len(registry), os.cpu_count() or 1) if total > PARALLEL_ABOVE_BYTES else 1
+
+    jobs = [(city, entry, compact, use_cache) for city, entry in registry.items()]
+    if workers > 1 and len(jobs) > 1:
+        context = multiprocessing.get_context(POOL_CONTEXT)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            frames = list(pool.map(_load_city_args, jobs))
+    else:
+        frames = [load_city(*job) for job in jobs]
+
+    df = pd.concat(frames, ignore_index=True)
+    # Categories differ per city, so concat falls back to objects; re-apply
+    return enforce_schema(df) if compact else df
@@ -0,0 +1,201 @@
+import json
+import os
+import time
+
+import pandas as pd
+
+from src.utils.anomalies import detect
+from src.utils.exposure import compute_exposure, update_exposure
+from src.utils.snapshot import build_snapshot, update_snapshot
+
+# Partitioned master store: data/master/city=<city>/month=<YYYY-MM>/part-*.parquet
+STORE_DIR = "data/master"
+WATERMARK_PATH = os.path.join(STORE_DIR, "_watermarks.parquet")
+# Latest reading and running min/max/count per series (see snapshot.py)
+SNAPSHOT_PATH = os.path.join(STORE_DIR, "_snapshot.parquet")
+# Detector state per series and the events it flagged (see anomalies.py)
+DETECTOR_STATE_PATH = os.path.join(STORE_DIR, "_detector_state.parquet")
+EVENTS_PATH = os.path.join(STORE_DIR, "_events.parquet")
+# Hourly rolling averages and NowCast per series (see exposure.py)
+EXPOSURE_PATH = os.path.join(STORE_DIR, "_exposure.parquet")
+# Renames of a staged append, written once everything is staged; its
+# presence is what commits the append
+JOURNAL_PATH = os.path.join(STORE_DIR, "_journal.json")
+# Files written by an append before it commits. Like every "_" name they
+# are skipped by dataset discovery and read_store
+STAGED_PREFIX = "_staged-"
+
+# One series per sensor and pollutant
+SERIES_KEYS = ["city", "location_id", "parameter"]
+DEDUP_KEYS = ["location_id", "parameter", "datetimeutc"]
+
+STORE_COLUMNS = [
+    "city", "location_id", "location_name", "parameter", "value", "unit",
+    "datetimeutc", "datetime", "timezone", "latitude", "longitude",
+]
+
+
+def to_store_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Shape a combined city frame into store rows with a typed UTC time.
+    """
+    rows = df.copy()
+    rows["datetimeutc"] = rows["timestamp"]
+    # Local clock time; the offset is implied by the city's timezone
+    rows["datetime"] = rows["datetimelocal"]
+    return rows.dropna(subset=["datetimeutc"])[STORE_COLUMNS]
+
+
+def load_watermarks() -> pd.DataFrame:
+    """
+    Latest stored UTC time per (city, location_id, parameter).
+    """
+    if not os.path.exists(WATERMARK_PATH):
+        return pd.DataFrame({
+            "city": pd.Series(dtype="object"),
+            "location_id": pd.Series(dtype="int64"),
+            "parameter": pd.Series(dtype="object"),
+            "watermark": pd.Series(dtype="datetime64[ns, UTC]"),
+        })
+    return pd.read_parquet(WATERMARK_PATH)
+
+
+def _read_optional(path: str) -> pd.DataFrame:
+    return pd.read_parquet(path) if os.path.exists(path) else None
+
+
+def load_snapshot() -> pd.DataFrame:
+    """
+    Stored snapshot table, or None before the first incremental append.
+    """
+    return _read_optional(SNAPSHOT_PATH)
+
+
+def _stage_parquet(df: pd.DataFrame, path: str) -> tuple:
+    # Write next to its final path under a staged name; returns the rename
+    staged = os.path.join(os.path.dirname(path), STAGED_PREFIX + os.path.basename(path))
+    df.to_parquet(staged, index=False)
+    return staged, path
+
+
+def _apply_journal():
+    # Idempotent: renames already done by an interrupted run are skipped
+    with open(JOURNAL_PATH, encoding="utf-8") as f:
+        renames = json.load(f)
+    for staged, final in renames:
+        if os.path.exists(staged):
+            os.replace(staged, final)
+    os.remove(JOURNAL_PATH)
+
+
+def recover():
+    """
+    Finish or discard an append that was interrupted.
+
+    A journal means the append committed, so its remaining renames are
+    replayed; staged files without one belong to an uncommitted append and
+    are removed.
+    """
+    if os.path.exists(JOURNAL_PATH):
+        _apply_journal()
+    for folder, _, names in os.walk(STORE_DIR):
+        for name in names:
+            if name.startswith(STAGED_PREFIX):
+                os.remove(os.path.join(folder, name))
+
+
+def new_rows(rows: pd.DataFrame, watermarks: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rows newer than their series' watermark, de-duplicated.
+    """
+    merged = rows.merge(watermarks, on=SERIES_KEYS, how="left")
+    fresh = merged[merged["watermark"].isna() | (merged["datetimeutc"] > merged["watermark"])]
+    return fresh.drop(columns="watermark").drop_duplicates(subset=DEDUP_KEYS, keep="last")
+
+
+def _stage_partitions(rows: pd.DataFrame) -> list:
+    # One new part file per touched partition; existing parts are never rewritten
+    stamp = time.time_ns()
+    month = rows["datetimeutc"].dt.strftime("%Y-%m")
+    renames = []
+    for (city, part_month), part in rows.groupby([rows["city"], month], observed=True):
+        part_dir = os.path.join(STORE_DIR, f"city={city}", f"month={part_month}")
+        os.makedirs(part_dir, exist_ok=True)
+        renames.append(_stage_parquet(part, os.path.join(part_dir, f"part-{stamp}.parquet")))
+    return renames
+
+
+def append_incremental(df: pd.DataFrame) -> int:
+    """
+    Append only rows newer than each series' watermark to the store.
+
+    Parts, derived tables and watermarks are staged first and committed
+    together by the journal, so a crash never leaves rows on disk that the
+    watermarks (and so the next append) do not account for. Returns the
+    number of rows written.
+    """
+    recover()
+    watermarks = load_watermarks()
+    fresh = new_rows(to_store_rows(df), watermarks)
+    if fresh.empty:
+        return 0
+
+    snapshot = load_snapshot()
+    state = _read_optional(DETECTOR_STATE_PATH)
+    events = _read_optional(EVENTS_PATH)
+    exposure = _read_optional(EXPOSURE_PATH)
+    if snapshot is None or state is None or exposure is None:
+        # Stores written before these tables existed are seeded once from disk
+        stored = read_store().rename(columns={"datetimeutc": "timestamp"})
+        if snapshot is None:
+            snapshot = build_snapshot(stored)
+        if state is None:
+            events, state = detect(stored)
+        if exposure is None:
+            exposure = compute_exposure(stored)
+    readings = fresh.rename(columns={"datetimeutc": "timestamp"})
+    snapshot = update_snapshot(snapshot, readings)
+    new_events, state = detect(readings, state)
+    events = new_events if events is None else pd.concat([events, new_events], ignore_index=True)
+    exposure = update_exposure(exposure, readings)
+
+    latest = fresh.groupby(SERIES_KEYS, as_index=False, observed=True)["datetimeutc"].max()
+    latest = latest.rename(columns={"datetimeutc": "watermark"})
+    updated = (
+        pd.concat([watermarks, latest], ignore_index=True)
+        .groupby(SERIES_KEYS, as_index=False, observed=True)["watermark"].max()
+    )
+
+    renames = _stage_partitions(fresh)
+    renames += [
+        _stage_parquet(snapshot, SNAPSHOT_PATH),
+        _stage_parquet(state, DETECTOR_STATE_PATH),
+        _stage_parquet(events, EVENTS_PATH),
+        _stage_parquet(exposure, EXPOSURE_PATH),
+        # Renamed last, so readers keyed on the watermark file see the rest first
+        _stage_parquet(updated, WATERMARK_PATH),
+    ]
+
+    # Writing the journal commits the append; the renames can then be replayed
+    journal_tmp = os.path.join(STORE_DIR, STAGED_PREFIX + os.path.basename(JOURNAL_PATH))
+    with open(journal_tmp, "w", encoding="utf-8") as f:
+        json.dump(renames, f)
+    os.replace(journal_tmp, JOURNAL_PATH)
+    _apply_journal()
+    return len(fresh)
+
+
+def read_store(city: str = None) -> pd.DataFrame:
+    """
+    Read the partitioned store (optionally a single city).
+    """
+    root = os.path.join(STORE_DIR, f"city={city}") if city else STORE_DIR
+    parts = [
+        os.path.join(folder, name)
+        for folder, _, names in os.walk(root)
+        for name in sorted(names)
+        if name.startswith("part-") and name.endswith(".parquet")
+    ]
+    if not parts:
+        return pd.DataFrame(columns=STORE_COLUMNS)
+    return pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+# Append every page run's stages here as JSON lines when set
+PERF_LOG = os.environ.get("LANTERN_PERF_LOG")
+
+# Each Streamlit session reruns its script on its own thread
+_local = threading.local()
+_process_id = uuid.uuid4().hex[:8]
+
+# The first finished run of a process also records how long the process
+# took to get there (cold start, including server boot and imports)
+_first_run_lock = threading.Lock()
+_first_run_done = False
+
+
+def _rss_bytes() -> int:
+    """
+    Resident memory of this process (0 if it cannot be read).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def process_age() -> float:
+    """
+    Seconds since this process started (None if it cannot be read).
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 is the start time in clock ticks after boot; the
+            # command name (field 2) may contain spaces, so split after it
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def start_run(page: str, session: str = None):
+    """
+    Begin timing one rerun of a page; stages are recorded with lap().
+    """
+    now = time.perf_counter()
+    _local.run = {
+        "session": session or _process_id,
+        "run_id": uuid.uuid4().hex[:8],
+        "page": page,
+        "started": time.time(),
+        "start": now,
+        "last": now,
+        "last_rss": _rss_bytes(),
+        "stages": [],
+    }
+
+
+def lap(stage: str, rows: int = None):
+    """
+    Record the work since the previous lap (or start_run) as one stage.
+    """
+    run = getattr(_local, "run", None)
+    if run is None:
+        return
+    now = time.perf_counter()
+    rss = _rss_bytes()
+    run["stages"].append({
+        "stage": stage,
+        "seconds": now - run["last"],
+        "rows": rows,
+        "mem_delta_bytes": rss - run["last_rss"],
+    })
+    run["last"] = now
+    run["last_rss"] = rss
+
+
+def finish_run() -> list:
+    """
+    Close the current run, export it if PERF_LOG is set, and return its
+    records (one dict per stage plus a "total" row, and a "cold start"
+    row on the process's first run).
+    """
+    run = getattr(_local, "run", None)
+    if run is None:
+        return []
+    _local.run = None
+
+    total = time.perf_counter() - run["start"]
+    stages = run["stages"] + [{
+        "stage": "total", "seconds": total, "rows": None, "mem_delta_bytes": None,
+    }]
+
+    global _first_run_done
+    with _first_run_lock:
+        first_run, _first_run_done = not _first_run_done, True
+    if first_run:
+        stages.append({
+            "stage": "cold start", "seconds": process_age(), "rows": None, "mem_delta_bytes": None,
+        })
+    records = [
+        {
+            "session": run["session"],
+            "run_id": run["run_id"],
+            "page": run["page"],
+            "time": run["started"],
+            **s,
+        }
+        for s in stages
+    ]
+
+    if PERF_LOG:
+        os.makedirs(os.path.dirname(PERF_LOG) or ".", exist_ok=True)
+        with open(PERF_LOG, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+    return records
+
+
+def render_panel(container, records: list):
+    """
+    Show a run's stage timings in a Streamlit container (e.g. st.sidebar).
+    """
+    if not records:
+        return
+    table = pd.DataFrame(records)[["stage", "seconds", "rows", "mem_delta_bytes"]]
+    table["ms"] = (table["seconds"] * 1000).round(1)
+    table["mem_delta_mb"] = (table["mem_delta_bytes"] / 1e6).round(2)
+    container.subheader("Performance")
+    container.caption(f"{records[0]['page']} — run {records[0]['run_id']}")
+    container.dataframe(table[["stage", "ms", "rows", "mem_delta_mb"]], hide_index=True)
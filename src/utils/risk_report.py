@@ -0,0 +1,176 @@
+"""
+Headless risk report over every city, sensor and pollutant.
+
+Run from the repo root:
+    python -m src.utils.risk_report --format json --output reports/risk.json
+    python -m src.utils.risk_report --format csv --workers 4 > risk.csv
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.utils.exposure import SERIES_KEYS, compute_exposure
+from src.utils.risk_scale import RISK_CATEGORIES, compute_risk_batch, risk_levels
+
+# Report columns counting hours spent at each level, e.g. hours_good
+HOUR_COLUMNS = {level: "hours_" + level.lower().replace(" ", "_") for level in risk_levels}
+
+# Concentrations are reported to the same precision the pages show
+VALUE_DECIMALS = {
+    "latest_value": 2, "current_24h_mean": 2, "worst_hour_mean": 2, "worst_24h_mean": 2,
+}
+
+
+def _classify(parameters: pd.Series, values: pd.Series) -> pd.Categorical:
+    # compute_risk_batch works per pollutant; run it once per pollutant
+    codes = np.empty(len(values), dtype="int8")
+    parameters = parameters.to_numpy()
+    values = values.to_numpy("float64")
+    for parameter in pd.unique(parameters):
+        mask = parameters == parameter
+        levels, _ = compute_risk_batch(str(parameter), values[mask])
+        codes[mask] = levels.cat.codes.to_numpy()
+    return pd.Categorical.from_codes(codes, categories=RISK_CATEGORIES)
+
+
+def _worst(table: pd.DataFrame, column: str, time_name: str, value_name: str,
+           level_name: str) -> pd.DataFrame:
+    # Hour with the highest value of column per series, plus its level
+    rows = table.dropna(subset=[column])
+    rows = rows.loc[rows.groupby(SERIES_KEYS, observed=True)[column].idxmax()]
+    return pd.DataFrame({
+        **{key: rows[key].to_numpy() for key in SERIES_KEYS},
+        time_name: rows["hour"].to_numpy(),
+        value_name: rows[column].to_numpy("float64"),
+        level_name: np.asarray(_classify(rows["parameter"], rows[column])),
+    })
+
+
+def series_report(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per (city, location_id, parameter): current level, hours at
+    each level and the worst hour / 24-hour period.
+
+    Hourly levels classify the mean of each clock hour with readings, so
+    the distribution counts hours rather than readings.
+    """
+    df = df.sort_values("timestamp", kind="stable")
+    latest = df.groupby(SERIES_KEYS, observed=True).tail(1)
+    report = pd.DataFrame({
+        **{key: latest[key].to_numpy() for key in SERIES_KEYS},
+        "location_name": latest["location_name"].to_numpy(),
+        "latitude": latest["latitude"].to_numpy(),
+        "longitude": latest["longitude"].to_numpy(),
+        "latest_time": latest["timestamp"].to_numpy(),
+        "latest_value": latest["value"].to_numpy("float64"),
+        "current_level": np.asarray(_classify(latest["parameter"], latest["value"])),
+    })
+
+    table = compute_exposure(df, nowcast=False)
+    table = table[table["count"] > 0].copy()
+    table["mean_1h"] = table["mean_1h"].astype("float64")
+    table["level"] = _classify(table["parameter"], table["mean_1h"])
+
+    current_24h = table.groupby(SERIES_KEYS, observed=True).tail(1)
+    current_24h = pd.DataFrame({
+        **{key: current_24h[key].to_numpy() for key in SERIES_KEYS},
+        "current_24h_mean": current_24h["mean_24h"].to_numpy("float64"),
+    })
+    current_24h["current_24h_level"] = np.where(
+        current_24h["current_24h_mean"].notna(),
+        np.asarray(_classify(current_24h["parameter"], current_24h["current_24h_mean"]), dtype=object),
+        None,
+    )
+
+    hours = (
+        table.groupby(SERIES_KEYS, observed=True)["level"]
+        .value_counts()
+        .unstack(fill_value=0)
+        .reindex(columns=risk_levels, fill_value=0)
+        .rename(columns=HOUR_COLUMNS)
+        .reset_index()
+    )
+    hours.columns.name = None
+
+    worst_hour = _worst(table, "mean_1h", "worst_hour", "worst_hour_mean", "worst_hour_level")
+    # The 24-hour window is labelled by its last hour
+    worst_24h = _worst(table, "mean_24h", "worst_24h_end", "worst_24h_mean", "worst_24h_level")
+
+    for part in (current_24h, hours, worst_hour, worst_24h):
+        report = report.merge(part.astype({key: report[key].dtype for key in SERIES_KEYS}),
+                              on=SERIES_KEYS, how="left")
+    return report.round(VALUE_DECIMALS)
+
+
+def _split(df: pd.DataFrame, parts: int) -> list:
+    # Whole series per part, so each worker sees complete histories
+    series = df.groupby(SERIES_KEYS, observed=True, sort=False).ngroup().to_numpy()
+    return [df[series % parts == i] for i in range(parts)]
+
+
+def build_report(df: pd.DataFrame, workers: int = None) -> pd.DataFrame:
+    """
+    Risk report for every series in df, split across a process pool.
+    """
+    if df.empty:
+        return series_report(df)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    n_series = df.groupby(SERIES_KEYS, observed=True).ngroups
+    workers = max(1, min(workers, n_series))
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(series_report, _split(df, workers)))
+    else:
+        parts = [series_report(df)]
+
+    report = pd.concat(parts, ignore_index=True)
+    return report.sort_values(SERIES_KEYS, ignore_index=True)
+
+
+def write_report(report: pd.DataFrame, fmt: str, out, dataset_version: str = None):
+    """
+    Write the report to a text stream as CSV or JSON (with a small header).
+    """
+    if fmt == "csv":
+        report.to_csv(out, index=False, date_format="%Y-%m-%dT%H:%M:%SZ")
+        return
+    payload = {
+        "generated_at": pd.Timestamp.now(tz="UTC").isoformat(),
+        "dataset_version": dataset_version,
+        "series": json.loads(report.to_json(orient="records", date_format="iso")),
+    }
+    json.dump(payload, out, indent=2)
+    out.write("\n")
+
+
+if __name__ == "__main__":
+    from src.utils.datasets import dataset_version, get_city_data
+
+    parser = argparse.ArgumentParser(description="Risk report for every city, sensor and pollutant.")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--output", default="-", help="file to write, or - for stdout")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all CPUs)")
+    parser.add_argument("--city", action="append", help="limit to a city (repeatable)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    data = get_city_data()
+    if args.city:
+        data = data[data["city"].isin(args.city)]
+    report = build_report(data, workers=args.workers)
+
+    if args.output == "-":
+        write_report(report, args.format, sys.stdout, dataset_version())
+    else:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            write_report(report, args.format, f, dataset_version())
+    print(f"{len(report)} series in {time.perf_counter() - start:.2f}s", file=sys.stderr)
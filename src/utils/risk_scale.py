@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+risk_levels = ["Good", "Satisfactory", "Moderately polluted", "Poor", "Very poor", "Severe"]
+
+#Lower bound of each risk level, in the same order as risk_levels
+#PM25 and PM10 threshold amounts from
+#https://www.airveda.com/blog/Understanding-Particulate-Matter-and-Its-Associated-Health-Impact
+RISK_BREAKPOINTS = {
+    "pm25": [0, 31, 61, 91, 121, 250],
+    "pm10": [0, 51, 101, 251, 351, 430],
+}
+
+INVALID_LEVEL = "Invalid Air Quality Value"
+UNKNOWN_LEVEL = "Parameter not recognized"
+
+#Every label compute_risk can return, used as the categories of batch results
+RISK_CATEGORIES = risk_levels + [INVALID_LEVEL, UNKNOWN_LEVEL]
+
+
+def compute_risk_batch(parameter: str, values):
+    """
+    Classify a whole array of readings at once.
+
+    Returns a categorical Series of risk levels (same labels as compute_risk)
+    and a Series counting readings per level.
+    """
+    values = np.asarray(values, dtype=float)
+
+    if parameter in RISK_BREAKPOINTS:
+        #Number of level thresholds at or below each value gives its level index
+        codes = np.searchsorted(RISK_BREAKPOINTS[parameter][1:], values, side="right")
+        #Missing values compare False everywhere in compute_risk, so they are Good
+        codes[np.isnan(values)] = 0
+        codes[values < 0] = RISK_CATEGORIES.index(INVALID_LEVEL)
+    else:
+        codes = np.full(values.shape, RISK_CATEGORIES.index(UNKNOWN_LEVEL))
+
+    levels = pd.Series(pd.Categorical.from_codes(codes, categories=RISK_CATEGORIES))
+    counts = levels.value_counts(sort=False)
+    return levels, counts
+
+
+def compute_risk(parameter: str, value: float) -> str:
+    levels, _ = compute_risk_batch(parameter, [value])
+    return levels.iloc[0]
@@ -0,0 +1,62 @@
+import pandas as pd
+
+# Time grains kept in the rollup store
+GRAINS = ["hour", "day", "month"]
+
+ROLLUP_KEYS = ["grain", "city", "location_id", "parameter", "period"]
+
+
+def _period(local: pd.Series, grain: str) -> pd.Series:
+    if grain == "month":
+        return local.dt.to_period("M").dt.to_timestamp()
+    return local.dt.floor("h" if grain == "hour" else "D")
+
+
+def build_rollups(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Count/sum/min/max of values per city, sensor, parameter and
+    hour/day/month (local time).
+    """
+    base = df[["city", "location_id", "parameter", "value"]].copy()
+    # Sums over years of readings need a wider accumulator than float32
+    base["value"] = base["value"].astype("float64")
+    local = df["datetimelocal"]
+
+    parts = []
+    for grain in GRAINS:
+        agg = (
+            base.assign(grain=grain, period=_period(local, grain))
+            .groupby(ROLLUP_KEYS, observed=True)["value"]
+            .agg(["count", "sum", "min", "max"])
+            .reset_index()
+        )
+        parts.append(agg)
+    return pd.concat(parts, ignore_index=True)
+
+
+def _select(rollups: pd.DataFrame, grain: str, city: str, parameter: str) -> pd.DataFrame:
+    return rollups[
+        (rollups["grain"] == grain) &
+        (rollups["city"] == city) &
+        (rollups["parameter"] == parameter)
+    ]
+
+
+def rollup_summary(rollups: pd.DataFrame, city: str, parameter: str):
+    """
+    Max, min and mean value for a city/parameter, from monthly rollups.
+    """
+    rows = _select(rollups, "month", city, parameter)
+    count = rows["count"].sum()
+    mean_val = rows["sum"].sum() / count if count else float("nan")
+    return rows["max"].max(), rows["min"].min(), mean_val
+
+
+def rollup_monthly(rollups: pd.DataFrame, city: str, parameter: str) -> pd.DataFrame:
+    """
+    Monthly average table (same shape as explorer.try_build_pivot).
+    """
+    rows = _select(rollups, "month", city, parameter)
+    monthly = rows.groupby("period")[["sum", "count"]].sum().reset_index()
+    monthly["avg_value"] = monthly["sum"] / monthly["count"]
+    return monthly.rename(columns={"period": "month"})[["month", "avg_value"]]
@@ -0,0 +1,52 @@
+import pandas as pd
+
+# Canonical in-memory layout of the combined city frame. Repeated strings
+# are categoricals; float32 keeps ~7 significant digits, which covers PM
+# readings and sensor coordinates (~0.5 m).
+CANONICAL_SCHEMA = {
+    "city": "category",
+    "location_id": "int32",
+    "location_name": "category",
+    "parameter": "category",
+    "value": "float32",
+    "unit": "category",
+    "timestamp": "datetime64[ns, UTC]",
+    "datetimelocal": "datetime64[ns]",
+    "timezone": "category",
+    "latitude": "float32",
+    "longitude": "float32",
+}
+
+
+def enforce_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Keep only the canonical columns, cast to their compact dtypes.
+    """
+    missing = [col for col in CANONICAL_SCHEMA if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns for canonical schema: {missing}")
+    return df[list(CANONICAL_SCHEMA)].astype(CANONICAL_SCHEMA)
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """
+    Bytes per row of each column before and after compaction.
+    """
+    rows_before = max(len(before), 1)
+    rows_after = max(len(after), 1)
+    report = pd.DataFrame({
+        "before": before.memory_usage(index=False, deep=True) / rows_before,
+        "after": after.memory_usage(index=False, deep=True) / rows_after,
+    })
+    report.loc["total"] = report.sum()
+    return report.round(1)
+
+
+if __name__ == "__main__":
+    from src.utils.ingest import ingest_cities
+
+    raw = ingest_cities(compact=False)
+    compact = ingest_cities()
+    print(f"Rows: {len(compact)}")
+    print("Bytes per row:")
+    print(memory_report(raw, compact).fillna("-").to_string())
@@ -0,0 +1,105 @@
+import json
+import os
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+from src.utils.cache import source_version
+from src.utils.schema import CANONICAL_SCHEMA
+from src.utils.sorted_index import INDEX_KEYS
+
+# build_master publishes the combined frame here for every worker process
+SHARED_DIR = "data/shared"
+MANIFEST_PATH = os.path.join(SHARED_DIR, "manifest.json")
+
+# Published files kept besides the current one; workers still mapping an
+# older file keep it alive (unlinked files stay valid while mapped)
+KEEP_PREVIOUS = 2
+
+
+def _write_json_atomic(path: str, payload: dict):
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def publish_shared(df: pd.DataFrame, version: str, shared_dir: str = SHARED_DIR) -> dict:
+    """
+    Write the combined frame as an uncompressed Arrow IPC file and point
+    the manifest at it.
+
+    Rows are stored in SortedIndex order so readers can index the mapped
+    frame without re-sorting (and copying) it. The manifest is replaced
+    atomically, so readers see either the old or the new version.
+    """
+    os.makedirs(shared_dir, exist_ok=True)
+    frame = df[list(CANONICAL_SCHEMA)].sort_values(
+        INDEX_KEYS + ["timestamp"], kind="stable", ignore_index=True
+    )
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+
+    name = f"city-{version}.arrow"
+    path = os.path.join(shared_dir, name)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+    manifest = {
+        "version": version,
+        "file": name,
+        "rows": len(frame),
+        "published_at": time.time(),
+    }
+    _write_json_atomic(os.path.join(shared_dir, os.path.basename(MANIFEST_PATH)), manifest)
+    _prune(shared_dir, keep=name)
+    return manifest
+
+
+def _prune(shared_dir: str, keep: str):
+    published = sorted(
+        (entry for entry in os.scandir(shared_dir)
+         if entry.name.startswith("city-") and entry.name.endswith(".arrow") and entry.name != keep),
+        key=lambda entry: entry.stat().st_mtime_ns,
+        reverse=True,
+    )
+    for entry in published[KEEP_PREVIOUS:]:
+        os.remove(entry.path)
+
+
+def read_manifest(shared_dir: str = SHARED_DIR) -> dict:
+    """
+    Current manifest, or None when nothing has been published.
+    """
+    path = os.path.join(shared_dir, os.path.basename(MANIFEST_PATH))
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def manifest_version(shared_dir: str = SHARED_DIR):
+    """
+    Cheap (mtime_ns, size) stamp of the manifest, None when missing.
+    """
+    path = os.path.join(shared_dir, os.path.basename(MANIFEST_PATH))
+    if not os.path.exists(path):
+        return None
+    version = source_version(path)
+    return version["mtime_ns"], version["size"]
+
+
+def map_shared(manifest: dict, shared_dir: str = SHARED_DIR) -> pd.DataFrame:
+    """
+    Memory-map a published file as a read-only canonical frame.
+
+    Numeric and timestamp columns are views on the shared pages; only
+    categorical codes and their (small) categories are copied.
+    """
+    source = pa.memory_map(os.path.join(shared_dir, manifest["file"]), "r")
+    table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True, self_destruct=False)
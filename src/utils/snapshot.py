@@ -0,0 +1,90 @@
+import pandas as pd
+
+from src.utils.risk_scale import compute_risk_batch
+
+SNAPSHOT_KEYS = ["city", "location_id", "parameter"]
+
+SNAPSHOT_COLUMNS = SNAPSHOT_KEYS + [
+    "location_name", "unit", "latitude", "longitude",
+    "latest_time", "latest_value", "first_time", "min_value", "max_value", "count",
+]
+
+
+def build_snapshot(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per (city, location_id, parameter): latest reading and its
+    time, plus first time and min/max/count over the series.
+
+    Expects the canonical frame (timestamp and value columns).
+    """
+    if df.empty:
+        return pd.DataFrame(columns=SNAPSHOT_COLUMNS)
+    ordered = df.dropna(subset=["value"]).sort_values("timestamp", kind="stable")
+    grouped = ordered.groupby(SNAPSHOT_KEYS, observed=True)
+    last = grouped.tail(1).set_index(SNAPSHOT_KEYS)
+    stats = grouped.agg(
+        first_time=("timestamp", "min"),
+        min_value=("value", "min"),
+        max_value=("value", "max"),
+        count=("value", "size"),
+    )
+    snapshot = stats.join(last[["location_name", "unit", "latitude", "longitude", "timestamp", "value"]])
+    snapshot = snapshot.rename(columns={"timestamp": "latest_time", "value": "latest_value"})
+    # Plain keys (not categoricals), so snapshots built from different
+    # batches concatenate and group without category mismatches
+    snapshot = snapshot.reset_index().astype({
+        "city": str, "parameter": str, "location_id": "int64", "location_name": str, "unit": str,
+    })
+    return snapshot[SNAPSHOT_COLUMNS]
+
+
+def update_snapshot(snapshot: pd.DataFrame, new_readings: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fold newly ingested readings into a snapshot without touching history.
+
+    Only the touched series change; a reading older than a series' latest
+    time updates its min/max/count but not its latest value.
+    """
+    fresh = build_snapshot(new_readings)
+    if fresh.empty:
+        return snapshot
+    if snapshot.empty:
+        return fresh
+
+    both = pd.concat([snapshot, fresh], ignore_index=True)
+    grouped = both.sort_values("latest_time", kind="stable").groupby(SNAPSHOT_KEYS, observed=True)
+    latest = grouped.tail(1).set_index(SNAPSHOT_KEYS)
+    stats = grouped.agg(
+        first_time=("first_time", "min"),
+        min_value=("min_value", "min"),
+        max_value=("max_value", "max"),
+        count=("count", "sum"),
+    )
+    merged = stats.join(latest[["location_name", "unit", "latitude", "longitude",
+                                "latest_time", "latest_value"]])
+    return merged.reset_index()[SNAPSHOT_COLUMNS]
+
+
+def current_conditions(snapshot: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per (city, parameter): the most recent reading across sensors, the
+    range of all readings, and its risk level, indexed for direct lookup.
+    """
+    ordered = snapshot.sort_values(["latest_time", "location_id"], kind="stable")
+    grouped = ordered.groupby(["city", "parameter"], observed=True)
+    latest = grouped.tail(1).set_index(["city", "parameter"])
+    conditions = grouped.agg(
+        first_time=("first_time", "min"),
+        min_value=("min_value", "min"),
+        max_value=("max_value", "max"),
+        count=("count", "sum"),
+        sensors=("location_id", "nunique"),
+    ).join(latest[["location_name", "unit", "latest_time", "latest_value"]])
+
+    levels = pd.Series(index=conditions.index, dtype="object")
+    for parameter in conditions.index.get_level_values("parameter").unique():
+        rows = conditions.index.get_level_values("parameter") == parameter
+        batch, _ = compute_risk_batch(str(parameter), conditions.loc[rows, "latest_value"])
+        levels[rows] = batch.astype(str).to_numpy()
+    conditions["level"] = levels
+    return conditions
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+INDEX_KEYS = ["city", "parameter"]
+
+
+def _to_utc64(value) -> np.datetime64:
+    # Naive bounds are taken as UTC, like the timestamp column
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return ts.to_datetime64()
+
+
+class SortedIndex:
+    """
+    Combined frame kept sorted by (city, parameter, timestamp), with an
+    offset table per (city, parameter) group.
+
+    Lookups are binary searches returning row slices of the sorted frame,
+    so their cost follows the result size rather than the dataset size.
+    """
+
+    def __init__(self, df: pd.DataFrame, time_col: str = "timestamp"):
+        self.time_col = time_col
+        keys = pd.MultiIndex.from_frame(df[INDEX_KEYS + [time_col]])
+        if keys.is_monotonic_increasing and isinstance(df.index, pd.RangeIndex):
+            # Already in index order (e.g. a published shared frame): no copy
+            self.frame = df
+        else:
+            self.frame = df.sort_values(INDEX_KEYS + [time_col], kind="stable", ignore_index=True)
+
+        # (city, parameter) -> (start, stop) row offsets
+        self.offsets = {
+            key: (int(rows[0]), int(rows[-1]) + 1)
+            for key, rows in self.frame.groupby(INDEX_KEYS, sort=True, observed=True).indices.items()
+        }
+        times = self.frame[time_col]
+        # Frames can carry any resolution (pandas 3 parses to microseconds);
+        # as_unit is free when the column is nanoseconds already
+        if times.dt.tz is not None:
+            # Epoch nanoseconds are UTC already; view them rather than convert
+            self._times = times.array.as_unit("ns").asi8.view("datetime64[ns]")
+        else:
+            self._times = times.array.as_unit("ns").to_numpy()
+        self._values = self.frame["value"].to_numpy()
+
+    def __len__(self):
+        return len(self.frame)
+
+    def cities(self) -> list:
+        return sorted({city for city, _ in self.offsets})
+
+    def parameters(self, city: str) -> list:
+        return sorted(parameter for c, parameter in self.offsets if c == city)
+
+    def group_bounds(self, city: str, parameter: str, start=None, end=None):
+        """
+        Row range of a city/parameter group, narrowed to [start, end] in time.
+        """
+        lo, hi = self.offsets.get((city, parameter), (0, 0))
+        if start is not None:
+            lo += int(np.searchsorted(self._times[lo:hi], _to_utc64(start), side="left"))
+        if end is not None:
+            hi = lo + int(np.searchsorted(self._times[lo:hi], _to_utc64(end), side="right"))
+        return lo, hi
+
+    def query(self, city: str, parameter: str, start=None, end=None,
+              min_value: float = None) -> pd.DataFrame:
+        """
+        Rows of one city/parameter, optionally within a time range and at
+        or above a minimum value.
+
+        Without min_value the result is a slice of the sorted frame (no
+        copy). Values are not sorted, so min_value is a mask over the
+        group's slice only.
+        """
+        lo, hi = self.group_bounds(city, parameter, start, end)
+        rows = self.frame.iloc[lo:hi]
+        if min_value is None:
+            return rows
+        return rows[self._values[lo:hi] >= min_value]
@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    # Brute-force haversine below; fine for the few thousand sensors we have
+    cKDTree = None
+
+# Mean Earth radius, km
+EARTH_RADIUS_KM = 6371.0088
+
+# Distance matrix cells evaluated at once by the brute-force search
+_BRUTE_FORCE_CELLS = 4_000_000
+
+SITE_KEYS = ["city", "parameter", "location_id"]
+
+
+def _unit_vectors(lat, lon) -> np.ndarray:
+    # Points on the unit sphere; straight-line (chord) distance between them
+    # is monotone in great-circle distance, so a KD-tree on them is exact
+    lat = np.radians(np.asarray(lat, dtype="float64"))
+    lon = np.radians(np.asarray(lon, dtype="float64"))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def _chord_to_km(chord) -> np.ndarray:
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0.0, 1.0))
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Great-circle distance in km, broadcasting over array inputs.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype="float64")) for x in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class SensorIndex:
+    """
+    Nearest-sensor lookups and inverse-distance weighting over a fixed set
+    of sensor coordinates.
+
+    Uses a scipy KD-tree on unit-sphere coordinates when scipy is
+    installed, otherwise a chunked brute-force haversine search. Both give
+    exact great-circle distances in km.
+    """
+
+    def __init__(self, latitude, longitude):
+        self.latitude = np.asarray(latitude, dtype="float64")
+        self.longitude = np.asarray(longitude, dtype="float64")
+        self._xyz = _unit_vectors(self.latitude, self.longitude)
+        self._tree = cKDTree(self._xyz) if cKDTree is not None and len(self) else None
+
+    def __len__(self) -> int:
+        return len(self.latitude)
+
+    def nearest(self, lat, lon, k: int = 1):
+        """
+        Distances (km) and positions of the k nearest sensors to each point.
+
+        Returns two (n_points, k) arrays, closest first.
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype="float64"))
+        lon = np.atleast_1d(np.asarray(lon, dtype="float64"))
+        k = min(k, len(self))
+        if k == 0:
+            empty = np.empty((len(lat), 0))
+            return empty, empty.astype("int64")
+
+        if self._tree is not None:
+            chord, pos = self._tree.query(_unit_vectors(lat, lon), k=k)
+            chord, pos = chord.reshape(len(lat), k), pos.reshape(len(lat), k)
+            return _chord_to_km(chord), pos
+
+        dist = np.empty((len(lat), k))
+        pos = np.empty((len(lat), k), dtype="int64")
+        step = max(1, _BRUTE_FORCE_CELLS // len(self))
+        for start in range(0, len(lat), step):
+            rows = slice(start, start + step)
+            d = haversine_km(lat[rows, None], lon[rows, None], self.latitude, self.longitude)
+            part = np.argpartition(d, k - 1, axis=1)[:, :k] if k < len(self) else np.tile(np.arange(k), (len(d), 1))
+            part_d = np.take_along_axis(d, part, axis=1)
+            order = np.argsort(part_d, axis=1)
+            pos[rows] = np.take_along_axis(part, order, axis=1)
+            dist[rows] = np.take_along_axis(part_d, order, axis=1)
+        return dist, pos
+
+    def idw(self, lat, lon, values, k: int = 8, power: float = 2.0, max_km: float = None) -> np.ndarray:
+        """
+        Inverse-distance-weighted estimate of values (one per sensor) at
+        each point, from its k nearest sensors.
+
+        A point on top of a sensor takes that sensor's value; points whose
+        nearest sensor is farther than max_km get NaN.
+        """
+        values = np.asarray(values, dtype="float64")
+        dist, pos = self.nearest(lat, lon, k)
+        if dist.shape[1] == 0:
+            return np.full(dist.shape[0], np.nan)
+
+        near = values[pos]
+        with np.errstate(divide="ignore"):
+            weights = 1.0 / dist ** power
+        weights[np.isnan(near)] = 0.0
+        exact = dist[:, 0] < 1e-6
+        weights[exact] = 0.0
+        weights[exact, 0] = 1.0
+
+        with np.errstate(invalid="ignore"):
+            estimate = (weights * np.nan_to_num(near)).sum(axis=1) / weights.sum(axis=1)
+        if max_km is not None:
+            estimate[dist[:, 0] > max_km] = np.nan
+        return estimate
+
+
+def sensor_sites(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per (city, parameter, location_id) with coordinates and the
+    sensor's mean reading.
+    """
+    located = df.dropna(subset=["latitude", "longitude"])
+    return (
+        located.groupby(SITE_KEYS, observed=True)
+        .agg(
+            location_name=("location_name", "first"),
+            latitude=("latitude", "mean"),
+            longitude=("longitude", "mean"),
+            mean_value=("value", "mean"),
+        )
+        .reset_index()
+    )
+
+
+def heat_grid(sites: pd.DataFrame, value_col: str = "mean_value", cells: int = 60,
+              pad_km: float = 2.0, k: int = 8, power: float = 2.0) -> dict:
+    """
+    IDW surface of one value per site over the sites' bounding box.
+
+    Returns {"values": (cells, cells) array with row 0 at the north edge,
+    "bounds": [[south, west], [north, east]]}, the layout folium's
+    ImageOverlay expects.
+    """
+    lat = sites["latitude"].to_numpy("float64")
+    lon = sites["longitude"].to_numpy("float64")
+    pad_lat = pad_km / 111.0
+    pad_lon = pad_km / (111.0 * max(np.cos(np.radians(lat.mean())), 0.01))
+    south, north = lat.min() - pad_lat, lat.max() + pad_lat
+    west, east = lon.min() - pad_lon, lon.max() + pad_lon
+
+    grid_lat, grid_lon = np.meshgrid(
+        np.linspace(north, south, cells), np.linspace(west, east, cells), indexing="ij"
+    )
+    index = SensorIndex(lat, lon)
+    values = index.idw(grid_lat.ravel(), grid_lon.ravel(), sites[value_col], k=k, power=power)
+    bounds = [[float(south), float(west)], [float(north), float(east)]]
+    return {"values": values.reshape(cells, cells), "bounds": bounds}
@@ -0,0 +1,290 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from src.utils.cache import source_version
+from src.utils.anomalies import empty_events
+from src.utils.downsample import minmax_bucket_indices
+from src.utils.exposure import compute_exposure, latest_exposure
+from src.utils.master_store import EVENTS_PATH, EXPOSURE_PATH, SNAPSHOT_PATH, STORE_DIR, WATERMARK_PATH, load_watermarks
+from src.utils.risk_scale import RISK_CATEGORIES, compute_risk_batch
+from src.utils.schema import CANONICAL_SCHEMA, enforce_schema
+from src.utils.snapshot import build_snapshot, update_snapshot
+
+# Part files keep pandas categoricals as dictionaries whose index width
+# varies per file, so the dataset is read through one fixed schema
+STORE_SCHEMA = pa.schema([
+    ("city", pa.string()),
+    ("location_id", pa.int32()),
+    ("location_name", pa.string()),
+    ("parameter", pa.string()),
+    ("value", pa.float32()),
+    ("unit", pa.string()),
+    ("datetimeutc", pa.timestamp("ns", tz="UTC")),
+    ("datetime", pa.timestamp("ns")),
+    ("timezone", pa.string()),
+    ("latitude", pa.float32()),
+    ("longitude", pa.float32()),
+    ("month", pa.string()),
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("city", pa.string()), ("month", pa.string())]), flavor="hive"
+)
+
+# Store column -> canonical frame column
+_CANONICAL_NAMES = {"datetimeutc": "timestamp", "datetime": "datetimelocal"}
+_ROW_COLUMNS = [name for name in STORE_SCHEMA.names if name != "month"]
+
+
+class StoreQuery:
+    """
+    Out-of-core queries over the partitioned master store (master_store.py).
+
+    Predicates are pushed into the Arrow dataset scan, so city and month
+    filters prune whole partitions, and summaries fold over record batches
+    instead of loading the history. Offers the same cities / parameters /
+    query interface as SortedIndex.
+    """
+
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+        self.dataset = ds.dataset(root, format="parquet", partitioning=PARTITIONING, schema=STORE_SCHEMA)
+        # The watermark table lists every series in a few rows
+        self._series = load_watermarks()
+
+    def __len__(self) -> int:
+        return self.dataset.count_rows()
+
+    def version(self) -> str:
+        """
+        Changes whenever an append moves the watermarks.
+        """
+        version = source_version(os.path.join(self.root, os.path.basename(WATERMARK_PATH)))
+        return f"store-{version['mtime_ns']}-{version['size']}"
+
+    def cities(self) -> list:
+        return sorted(self._series["city"].astype(str).unique())
+
+    def parameters(self, city: str) -> list:
+        series = self._series[self._series["city"] == city]
+        return sorted(series["parameter"].astype(str).unique())
+
+    def _filter(self, city: str, parameter: str, start=None, end=None, min_value: float = None):
+        expr = (ds.field("city") == city) & (ds.field("parameter") == parameter)
+        if start is not None:
+            start = pd.Timestamp(start, tz="UTC") if pd.Timestamp(start).tzinfo is None else pd.Timestamp(start)
+            expr &= (ds.field("month") >= start.strftime("%Y-%m")) & (ds.field("datetimeutc") >= start)
+        if end is not None:
+            end = pd.Timestamp(end, tz="UTC") if pd.Timestamp(end).tzinfo is None else pd.Timestamp(end)
+            expr &= (ds.field("month") <= end.strftime("%Y-%m")) & (ds.field("datetimeutc") < end)
+        if min_value is not None:
+            expr &= ds.field("value") >= min_value
+        return expr
+
+    def _batches(self, columns: list, **where):
+        return self.dataset.to_batches(columns=columns, filter=self._filter(**where))
+
+    def _frames(self, columns: list, **where):
+        # Matching rows one record batch at a time, under canonical names
+        for batch in self._batches(columns, **where):
+            if batch.num_rows:
+                yield batch.to_pandas().rename(columns=_CANONICAL_NAMES)
+
+    def query(self, city: str, parameter: str, start=None, end=None,
+              min_value: float = None) -> pd.DataFrame:
+        """
+        Rows of one city and pollutant in the canonical schema, sorted by
+        time. Only the matching rows are materialized.
+        """
+        table = self.dataset.to_table(
+            columns=_ROW_COLUMNS,
+            filter=self._filter(city, parameter, start, end, min_value),
+        )
+        df = table.to_pandas().rename(columns=_CANONICAL_NAMES)
+        df = enforce_schema(df)
+        return df.sort_values("timestamp", kind="stable", ignore_index=True)
+
+    def iter_query(self, city: str, parameter: str, min_value: float = None):
+        """
+        The rows of query() one record batch at a time, in store order, for
+        streaming them out without loading the series.
+        """
+        for frame in self._frames(_ROW_COLUMNS, city=city, parameter=parameter, min_value=min_value):
+            yield enforce_schema(frame)
+
+    def count(self, city: str, parameter: str, min_value: float = None) -> int:
+        return self.dataset.count_rows(filter=self._filter(city, parameter, min_value=min_value))
+
+    def largest(self, city: str, parameter: str, n: int, by: str = "value",
+                min_value: float = None) -> pd.DataFrame:
+        """
+        The n matching rows with the largest `by` column, largest first (ties
+        go to the earlier reading, as nlargest on a time-sorted frame does).
+        Each batch only hands on its own top n.
+        """
+        parts = [
+            frame.nlargest(n, by, keep="all")
+            for frame in self.iter_query(city, parameter, min_value)
+        ]
+        if not parts:
+            return pd.DataFrame(columns=list(CANONICAL_SCHEMA)).astype(CANONICAL_SCHEMA)
+        candidates = pd.concat(parts, ignore_index=True)
+        candidates = candidates.sort_values("timestamp", kind="stable", ignore_index=True)
+        return candidates.nlargest(n, by)
+
+    def sensors(self, city: str, parameter: str, min_value: float = None) -> pd.DataFrame:
+        """
+        One row per located sensor: name, mean coordinates, reading count,
+        mean and max value. Folded over batches from per-batch partial sums.
+        """
+        parts = []
+        columns = ["location_id", "location_name", "value", "latitude", "longitude"]
+        for frame in self._frames(columns, city=city, parameter=parameter, min_value=min_value):
+            located = frame.dropna(subset=["latitude", "longitude"]).astype({
+                "value": "float64", "latitude": "float64", "longitude": "float64",
+            })
+            parts.append(located.groupby("location_id").agg(
+                location_name=("location_name", "first"),
+                latitude=("latitude", "sum"),
+                longitude=("longitude", "sum"),
+                readings=("value", "size"),
+                value_sum=("value", "sum"),
+                value_count=("value", "count"),
+                max_value=("value", "max"),
+            ))
+        if not parts:
+            return pd.DataFrame(columns=["location_id", "location_name", "latitude", "longitude",
+                                         "readings", "mean_value", "max_value"])
+        totals = pd.concat(parts).groupby(level=0).agg({
+            "location_name": "first", "latitude": "sum", "longitude": "sum", "readings": "sum",
+            "value_sum": "sum", "value_count": "sum", "max_value": "max",
+        })
+        totals["latitude"] /= totals["readings"]
+        totals["longitude"] /= totals["readings"]
+        totals["mean_value"] = totals["value_sum"] / totals["value_count"]
+        return totals.reset_index()[["location_id", "location_name", "latitude", "longitude",
+                                     "readings", "mean_value", "max_value"]]
+
+    def line_points(self, city: str, parameter: str, n_out: int, min_value: float = None):
+        """
+        About n_out (local time, value) points for a line chart, picked
+        during the scan: the lowest and highest reading of each of n_out / 2
+        equal-time buckets, so spikes survive and only those rows are kept.
+        """
+        where = dict(city=city, parameter=parameter, min_value=min_value)
+        first, last = None, None
+        for batch in self._batches(["datetime"], **where):
+            bounds = pc.min_max(batch["datetime"].cast(pa.int64()))
+            if bounds["min"].is_valid:
+                low, high = bounds["min"].as_py(), bounds["max"].as_py()
+                first = low if first is None else min(first, low)
+                last = high if last is None else max(last, high)
+        if first is None:
+            return np.array([], dtype="datetime64[ns]"), np.array([], dtype="float64")
+
+        width = (last - first) // max(n_out // 2, 1) + 1
+        xs, ys = [np.array([], dtype="int64")], [np.array([], dtype="float64")]
+        for frame in self._frames(["datetime", "value"], **where):
+            frame = frame.dropna()
+            x = frame["datetimelocal"].to_numpy("datetime64[ns]").astype("int64")
+            y = frame["value"].to_numpy("float64")
+            keep = minmax_bucket_indices(y, (x - first) // width)
+            xs.append(x[keep])
+            ys.append(y[keep])
+
+        x, y = np.concatenate(xs), np.concatenate(ys)
+        keep = minmax_bucket_indices(y, (x - first) // width)
+        keep = keep[np.argsort(x[keep], kind="stable")]
+        return x[keep].astype("datetime64[ns]"), y[keep]
+
+    def summary(self, city: str, parameter: str, min_value: float = None):
+        """
+        (max, min, mean, unit) of matching readings; NaNs when none match.
+        """
+        high, low, total, count, unit = -np.inf, np.inf, 0.0, 0, ""
+        for batch in self._batches(["value", "unit"], city=city, parameter=parameter, min_value=min_value):
+            if batch.num_rows == 0:
+                continue
+            bounds = pc.min_max(batch["value"])
+            if bounds["min"].is_valid:
+                high = max(high, bounds["max"].as_py())
+                low = min(low, bounds["min"].as_py())
+            total += pc.sum(batch["value"].cast(pa.float64())).as_py() or 0.0
+            count += pc.count(batch["value"]).as_py()
+            unit = unit or batch["unit"][0].as_py()
+        if count == 0:
+            return np.nan, np.nan, np.nan, unit
+        return high, low, total / count, unit
+
+    def monthly(self, city: str, parameter: str, min_value: float = None) -> pd.DataFrame:
+        """
+        Average value per local calendar month (same shape as try_build_pivot).
+        """
+        parts = []
+        for batch in self._batches(["datetime", "value"], city=city, parameter=parameter, min_value=min_value):
+            if batch.num_rows == 0:
+                continue
+            month = pc.floor_temporal(batch["datetime"], unit="month")
+            table = pa.table({"month": month, "value": batch["value"].cast(pa.float64())})
+            parts.append(table.group_by("month").aggregate([("value", "sum"), ("value", "count")]).to_pandas())
+        if not parts:
+            return pd.DataFrame(columns=["month", "avg_value"])
+        sums = pd.concat(parts).groupby("month")[["value_sum", "value_count"]].sum()
+        pivot = (sums["value_sum"] / sums["value_count"]).rename("avg_value").reset_index()
+        return pivot.dropna(subset=["month"])
+
+    def snapshot(self) -> pd.DataFrame:
+        """
+        Latest reading and running stats per series: the table appends
+        maintain, or one pass over the store for stores without it.
+        """
+        path = os.path.join(self.root, os.path.basename(SNAPSHOT_PATH))
+        if os.path.exists(path):
+            return pd.read_parquet(path)
+        snapshot = build_snapshot(pd.DataFrame())
+        columns = ["city", "location_id", "location_name", "parameter", "value", "unit",
+                   "datetimeutc", "latitude", "longitude"]
+        for batch in self.dataset.to_batches(columns=columns):
+            readings = batch.to_pandas().rename(columns={"datetimeutc": "timestamp"})
+            snapshot = update_snapshot(snapshot, readings)
+        return snapshot
+
+    def events(self) -> pd.DataFrame:
+        """
+        Spike and flatline events appends have flagged (empty before any).
+        """
+        path = os.path.join(self.root, os.path.basename(EVENTS_PATH))
+        return pd.read_parquet(path) if os.path.exists(path) else empty_events()
+
+    def latest_exposure(self, city: str, parameter: str) -> pd.DataFrame:
+        """
+        Latest hour of exposure averages per current sensor of one city and
+        pollutant, from the table appends maintain (or computed from the
+        store for stores without it).
+        """
+        path = os.path.join(self.root, os.path.basename(EXPOSURE_PATH))
+        if os.path.exists(path):
+            table = pd.read_parquet(path, filters=[("city", "==", city), ("parameter", "==", parameter)])
+        else:
+            table = compute_exposure(self.query(city, parameter))
+        return latest_exposure(table)
+
+    def risk_counts(self, city: str, parameter: str) -> pd.Series:
+        """
+        Readings per risk level (same result as compute_risk_batch's counts).
+        """
+        counts = pd.Series(0, index=pd.CategoricalIndex(RISK_CATEGORIES, categories=RISK_CATEGORIES))
+        for batch in self._batches(["value"], city=city, parameter=parameter):
+            values = batch["value"].to_numpy(zero_copy_only=False)
+            _, batch_counts = compute_risk_batch(parameter, values)
+            counts = counts.add(batch_counts, fill_value=0)
+        return counts.astype("int64")
+
+
+def store_available(root: str = STORE_DIR) -> bool:
+    return os.path.exists(os.path.join(root, os.path.basename(WATERMARK_PATH)))
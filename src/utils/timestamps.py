@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import pandas as pd
+
+# Timestamp layouts found in OpenAQ exports, tried in order
+OPENAQ_TIME_FORMATS = [
+    "%Y-%m-%dT%H:%M:%S%z",  # 2025-11-25T01:00:00Z, 2025-11-24T20:00:00-05:00
+    "%Y-%m-%d %H:%M:%S%z",  # 2025-11-25 02:00:00+00:00
+]
+
+# Preferred source column for the canonical time, most reliable first
+TIME_COLUMNS = ["datetimeutc", "datetimelocal", "datetime"]
+
+
+def detect_time_format(values: pd.Series) -> str:
+    """
+    Pick the explicit format matching the first non-empty value.
+    """
+    sample = values.dropna()
+    if sample.empty:
+        return "ISO8601"
+    sample = str(sample.iloc[0])
+    for fmt in OPENAQ_TIME_FORMATS:
+        try:
+            datetime.strptime(sample, fmt)
+            return fmt
+        except ValueError:
+            continue
+    # Unknown layout: pandas' ISO parser is still much faster than "mixed"
+    return "ISO8601"
+
+
+def parse_utc(values: pd.Series) -> pd.Series:
+    """
+    Parse OpenAQ timestamp strings (any offset) to tz-aware UTC.
+    """
+    return pd.to_datetime(values, format=detect_time_format(values), utc=True, errors="coerce")
+
+
+def normalize_timestamps(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the canonical UTC "timestamp" column, parsed once.
+    """
+    for col in TIME_COLUMNS:
+        if col in df.columns:
+            df["timestamp"] = parse_utc(df[col])
+            return df
+    raise ValueError("No valid datetime column found.")
+
+
+def localize(df: pd.DataFrame, timezone: str) -> pd.DataFrame:
+    """
+    Attach the city timezone and its local clock time ("datetimelocal",
+    naive) derived from the UTC timestamp, without re-parsing strings.
+    """
+    df["timezone"] = timezone
+    df["datetimelocal"] = df["timestamp"].dt.tz_convert(timezone).dt.tz_localize(None)
+    return df